@@ -0,0 +1,238 @@
+"""
+Synthesis pipeline benchmark
+Runs AudiobookGenerator.create_audiobook against a deterministic CPU-only fake model and reports throughput as JSON
+"""
+
+import argparse
+import json
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# Roughly the pace of XTTS speech (~15 characters per second of audio)
+SECONDS_PER_CHAR = 0.066
+
+# Fake model cost; 50 microseconds per character is in the range of XTTS on a fast GPU
+COST_PER_CHAR = 50e-6
+
+_WORDS = ("the", "of", "and", "a", "to", "in", "was", "he", "she", "it", "that", "his", "her",
+          "with", "for", "as", "had", "on", "at", "by", "not", "but", "from", "they", "were",
+          "river", "morning", "letter", "window", "silence", "garden", "question", "journey",
+          "remembered", "quietly", "afterwards", "library", "harbour", "lantern", "evening")
+
+
+class FakeTTS:
+    """Stand-in for a Coqui TTS object; sleeps in proportion to the text and returns a tone"""
+
+    def __init__(self, sample_rate: int = 24000, cost_per_char: float = COST_PER_CHAR,
+                 seconds_per_char: float = SECONDS_PER_CHAR):
+        self.synthesizer = _FakeSynthesizer(sample_rate)
+        self.cost_per_char = cost_per_char
+        self.seconds_per_char = seconds_per_char
+        t = np.arange(sample_rate, dtype=np.float32) / sample_rate
+        self._tone = (0.3 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)  # One second at 220 Hz
+
+    def tts(self, text: str, **kwargs) -> np.ndarray:
+        time.sleep(len(text) * self.cost_per_char)
+        samples = int(len(text) * self.seconds_per_char * self.synthesizer.output_sample_rate)
+        return np.resize(self._tone, samples)
+
+
+class _FakeSynthesizer:
+    def __init__(self, sample_rate: int):
+        self.output_sample_rate = sample_rate
+        self.tts_model = None  # No XTTS internals, so the generator takes the plain tts() path
+
+
+class FakeRegistry:
+    """ModelRegistry look-alike that hands out one FakeTTS"""
+
+    def __init__(self, tts: FakeTTS):
+        self.tts = tts
+
+    def get(self, model: str = None, device: Optional[str] = None, dtype: str = "float32") -> FakeTTS:
+        return self.tts
+
+
+def make_corpus(chars: int, seed: int = 0) -> str:
+    """Deterministic English-like text of about the given length, in paragraphs of sentences"""
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < chars:
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 24))]
+            sentences.append(" ".join(words).capitalize() + rng.choice(".....?!"))
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:chars]
+
+
+class StageTimer:
+    """Accumulates wall time per pipeline stage, safe to call from the writer and encoder threads"""
+
+    def __init__(self, origin: float):
+        self.origin = origin
+        self.stages = {}  # stage -> {"calls", "seconds", "first_done"}
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                with self._lock:
+                    entry = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0,
+                                                           "first_done": end - self.origin})
+                    entry["calls"] += 1
+                    entry["seconds"] += end - start
+        return timed
+
+    def report(self) -> Dict:
+        return {stage: {"calls": entry["calls"], "seconds": round(entry["seconds"], 4)}
+                for stage, entry in self.stages.items()}
+
+
+@contextmanager
+def _patched(target, name: str, replacement):
+    original = getattr(target, name)
+    setattr(target, name, replacement)
+    try:
+        yield
+    finally:
+        setattr(target, name, original)
+
+
+@contextmanager
+def instrument(generator, timer: StageTimer):
+    """Time each stage by wrapping the functions create_audiobook calls for it"""
+    from read2me.lib import audio_writer, encoding, read2me_lib
+
+    with _patched(read2me_lib, "split_text", timer.wrap("split", read2me_lib.split_text)), \
+            _patched(generator, "synthesize", timer.wrap("synth", generator.synthesize)), \
+            _patched(read2me_lib, "write_wav", timer.wrap("write", read2me_lib.write_wav)), \
+            _patched(audio_writer, "write_wav", timer.wrap("write", audio_writer.write_wav)), \
+            _patched(encoding, "encode_file", timer.wrap("encode", encoding.encode_file)):
+        yield
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(chars: int, output_format: str = "wav", pipeline: bool = False,
+             max_chapter_length: int = 10000, cost_per_char: float = COST_PER_CHAR,
+             seed: int = 0) -> Dict:
+    """Generate one audiobook from a synthetic corpus and measure it"""
+    from read2me.lib.read2me_lib import AudiobookGenerator
+
+    text = make_corpus(chars, seed)
+    output_dir = tempfile.mkdtemp(prefix="read2me-bench-")
+    try:
+        generator = AudiobookGenerator(output_dir=output_dir, device="cpu",
+                                       registry=FakeRegistry(FakeTTS(cost_per_char=cost_per_char)))
+        start = time.perf_counter()
+        timer = StageTimer(start)
+        with instrument(generator, timer):
+            metadata = generator.create_audiobook(
+                text, title="benchmark", max_chapter_length=max_chapter_length,
+                output_format=output_format, pipeline=pipeline
+            )
+        wall = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    # First audio is the first chapter file in its final format
+    final_stage = "write" if output_format == "wav" else "encode"
+    audio_seconds = metadata["total_duration"]
+    return {
+        "chars": len(text),
+        "chapters": metadata["total_chapters"],
+        "output_format": output_format,
+        "pipeline": pipeline,
+        "wall_seconds": round(wall, 4),
+        "chars_per_second": round(len(text) / wall, 1),
+        "audio_seconds": round(audio_seconds, 2),
+        "real_time_factor": round(wall / audio_seconds, 5) if audio_seconds else None,
+        "time_to_first_audio": round(timer.stages[final_stage]["first_done"], 4),
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": timer.report(),
+    }
+
+
+def run_benchmark(sizes: List[int], isolate: bool = True, **options) -> Dict:
+    """Run every corpus size, each in a fresh process unless isolate is False (peak RSS is per process)"""
+    results = []
+    for chars in sizes:
+        if isolate:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                results.append(pool.submit(run_case, chars, **options).result())
+        else:
+            results.append(run_case(chars, **options))
+    return {
+        "benchmark": "pipeline",
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "options": options,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audiobook pipeline with a fake TTS model")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Corpus sizes in characters")
+    parser.add_argument("--format", dest="output_format", default="wav", choices=["wav", "opus", "mp3"],
+                        help="Chapter format (opus/mp3 need ffmpeg and add the encode stage)")
+    parser.add_argument("--pipeline", action="store_true", help="Write chapters on the writer thread")
+    parser.add_argument("--max-chapter-length", type=int, default=10000)
+    parser.add_argument("--cost-per-char", type=float, default=COST_PER_CHAR,
+                        help="Fake model seconds per input character")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run all sizes in this process (peak RSS becomes cumulative)")
+    parser.add_argument("--output", "-o", help="Write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmark(
+        args.sizes,
+        isolate=not args.in_process,
+        output_format=args.output_format,
+        pipeline=args.pipeline,
+        max_chapter_length=args.max_chapter_length,
+        cost_per_char=args.cost_per_char,
+        seed=args.seed
+    )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,31 @@
 import yt_dlp
 import os
-import subprocess
 import os
 import numpy as np
-from pydub import AudioSegment
+import wave
 
-import os
-import speech_recognition as sr
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from pydub.silence import split_on_silence
+from concurrent.futures import ProcessPoolExecutor
 import json
 import sys
 import argparse
 
+from conditioning import TARGET_SAMPLE_RATE, condition_audio, open_pcm
+from recognizers import BACKENDS, UNINTELLIGIBLE, transcribe_files
+from silence import detect_silence, split_ranges
+
 """
 This program takes two inputs and constructs this directory structure:
 
 ../data/audio/<title>/
-    full_mono.wav
+    full_mono.wav  (mono, 22050 Hz, ends trimmed, peak-normalized)
     wavs/
         sentence_<n>.wav  (for each sentence)
-    metadata.txt  (sorted by transcript length)
+    transcripts.jsonl  (checkpoint, one line per transcribed clip)
+    metadata.json  (sorted by clip number)
+
+Every step can be re-run: the download is skipped if full_mono.wav exists,
+clips already on disk are not exported again, and clips in the checkpoint
+are not transcribed again.
 """
 
 def update_voice_clips_json(title, url):
@@ -39,11 +44,16 @@ def update_voice_clips_json(title, url):
     with open(json_path, 'w') as f:
         json.dump(voice_clips, f, indent=4)
 
-def download_youtube_audio(url, title):
+def download_youtube_audio(url, title, sample_rate=TARGET_SAMPLE_RATE):
     output_dir=f"../data/audio/{title}"
     # Ensure the output directory exists
     os.makedirs(output_dir, exist_ok=True)
 
+    mono_file = os.path.join(output_dir, "full_mono.wav")
+    if os.path.exists(mono_file):
+        print(f"[*] Skipped download (already exists): {mono_file}")
+        return
+
     # Configure yt-dlp options
     ydl_opts = {
         "format": "bestaudio/best",
@@ -60,19 +70,47 @@ def download_youtube_audio(url, title):
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         ydl.download([url])
 
-    # Convert stereo to mono
+    # Downmix, resample, trim and normalize in a single write
     stereo_file = os.path.join(output_dir, "full_stereo.wav")
-    mono_file = os.path.join(output_dir, "full_mono.wav")
-    subprocess.run(["ffmpeg", "-i", stereo_file, "-ac", "1", mono_file])
+    duration = condition_audio(stereo_file, mono_file, sample_rate=sample_rate)
+    print(f"[+] Conditioned {duration:.1f}s of audio at {sample_rate} Hz: {mono_file}")
 
     # Remove the stereo file
     os.remove(stereo_file)
 
 
-def break_into_sentences(title):
+_export_samples = None  # per worker process: (memory-mapped samples, frame rate)
+
+
+def _init_export_worker(audio_path):
+    global _export_samples
+    samples, frame_rate, _ = open_pcm(audio_path)
+    _export_samples = (samples, frame_rate)
+
+
+def export_chunk(task):
+    """Write one chunk of the memory-mapped source; skips chunks already written"""
+    start_ms, end_ms, output_path = task
+    samples, frame_rate = _export_samples
+    frames = samples[start_ms * frame_rate // 1000:end_ms * frame_rate // 1000]
+    expected_size = 44 + frames.nbytes
+    if os.path.exists(output_path) and os.path.getsize(output_path) == expected_size:
+        return False
+
+    tmp_path = output_path + ".tmp"
+    with wave.open(tmp_path, "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(frame_rate)
+        f.writeframes(np.ascontiguousarray(frames).tobytes())
+    os.replace(tmp_path, output_path)
+    return True
+
+
+def break_into_sentences(title, workers=None):
 
     audio_path = f"../data/audio/{title}/full_mono.wav"
-    audio = AudioSegment.from_wav(audio_path)
+    samples, frame_rate, _ = open_pcm(audio_path)
 
     min_silence_len = 500  # minimum length of silence (in ms)
     silence_thresh = -40  # silence threshold (in dB)
@@ -80,62 +118,44 @@ def break_into_sentences(title):
         300  # amount of silence to keep at the beginning and end of each chunk (in ms)
     )
 
-    chunks = split_on_silence(
-        audio,
-        min_silence_len=min_silence_len,
-        silence_thresh=silence_thresh,
-        keep_silence=keep_silence,
-    )
+    length_ms = int(round(len(samples) * 1000 / frame_rate))
+    silent_ranges = detect_silence(samples, frame_rate, min_silence_len, silence_thresh)
+    chunks = split_ranges(length_ms, silent_ranges, keep_silence)
 
     output_dir = f"../data/audio/{title}/wavs"
     os.makedirs(output_dir, exist_ok=True)
 
-    # Export each chunk as a separate audio file
-    for i, chunk in enumerate(chunks):
-        output_path = os.path.join(output_dir, f"sentence_{i+1:05d}.wav")
-        chunk.export(output_path, format="wav")
-
-    print(f"Audio split into {len(chunks)} sentences and saved in {output_dir}")
-
-
-def transcribe_audio(file_path):
-    # Initialize recognizer
-    r = sr.Recognizer()
-
-    # Transcribe audio
-    with sr.AudioFile(file_path) as source:
-        audio = r.record(source)
-
-    try:
-        # Attempt transcription
-        transcript = r.recognize_google(audio)
-    except sr.UnknownValueError:
-        transcript = "Could not understand audio"
-    except sr.RequestError as e:
-        transcript = f"Could not request results; {e}"
-
-    return transcript
-
-
-def transcribe_file(wav_file, wav_dir, existing_data):
-    file_path = os.path.join(wav_dir, wav_file)
-    base_name = os.path.splitext(wav_file)[0]
-
-    # Check if the file already exists in the metadata
-    if base_name in existing_data:
-        return None, f"[*] Skipped (already exists): {wav_file}"
-
-    # If not found, proceed with transcription
-    transcript = transcribe_audio(file_path)
-    if transcript != "Could not understand audio":
-        return (base_name, transcript), f"[+] Transcribed and added: {wav_file}"
-    else:
-        return None, f"[!] Failed transcription for {wav_file}"
-
-
-def transcribe_directory(title):
+    # Export chunks in parallel, each worker reading its slices from the memory-mapped source
+    tasks = [
+        (start, end, os.path.join(output_dir, f"sentence_{i+1:05d}.wav"))
+        for i, (start, end) in enumerate(chunks)
+    ]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_export_worker,
+                             initargs=(audio_path,)) as executor:
+        written = sum(executor.map(export_chunk, tasks, chunksize=64))
+
+    print(f"Audio split into {len(chunks)} sentences ({written} newly written) and saved in {output_dir}")
+
+
+def load_checkpoint(checkpoint_file):
+    """Transcripts recorded so far; a line cut short by an interrupted run is ignored"""
+    entries = {}
+    if not os.path.exists(checkpoint_file):
+        return entries
+    with open(checkpoint_file, "r") as in_file:
+        for line in in_file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entries[entry["clip"]] = entry["transcript"]
+    return entries
+
+
+def transcribe_directory(title, recognizer="google", workers=None, **options):
     wav_dir = f"../data/audio/{title}/wavs"
     output_file = f"../data/audio/{title}/metadata.json"
+    checkpoint_file = f"../data/audio/{title}/transcripts.jsonl"
 
     # Get all WAV files in the directory and sort them
     wav_files = sorted([f for f in os.listdir(wav_dir) if f.endswith(".wav")])
@@ -146,21 +166,38 @@ def transcribe_directory(title):
         with open(output_file, "r") as in_file:
             existing_data = json.load(in_file)
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = []
-        for wav_file in wav_files:
-            future = executor.submit(transcribe_file, wav_file, wav_dir, existing_data)
-            futures.append(future)
-
-        new_entries = {}
-        for future in as_completed(futures):
-            result, message = future.result()
-            if result:
-                base_name, transcript = result
-                new_entries[base_name] = transcript
-            print(message)
-
-    # Combine existing and new entries
+    # Clips transcribed by an earlier, possibly interrupted, run
+    checkpointed = load_checkpoint(checkpoint_file)
+    done = set(existing_data) | set(checkpointed)
+    pending = [f for f in wav_files if os.path.splitext(f)[0] not in done]
+    print(f"[*] Skipped {len(wav_files) - len(pending)} clips already transcribed")
+
+    # Each result is appended and flushed as it arrives, so an interrupted run loses at most the clips in flight
+    with open(checkpoint_file, "a") as checkpoint:
+        if checkpoint.tell() > 0:
+            # Terminate a line cut short by an interrupted run before appending
+            with open(checkpoint_file, "rb") as in_file:
+                in_file.seek(-1, os.SEEK_END)
+                if in_file.read(1) != b"\n":
+                    checkpoint.write("\n")
+        paths = [os.path.join(wav_dir, wav_file) for wav_file in pending]
+        for path, transcript in transcribe_files(paths, recognizer, workers, **options):
+            wav_file = os.path.basename(path)
+            if transcript is None:
+                # Not checkpointed, so the clip is retried on the next run
+                print(f"[!] Failed transcription for {wav_file}")
+                continue
+            base_name = os.path.splitext(wav_file)[0]
+            checkpointed[base_name] = transcript
+            checkpoint.write(json.dumps({"clip": base_name, "transcript": transcript}) + "\n")
+            checkpoint.flush()
+            print(f"[+] Transcribed: {wav_file}")
+
+    # Combine existing and new entries; unintelligible clips stay in the checkpoint only, so they are not retried
+    new_entries = {
+        name: transcript for name, transcript in checkpointed.items()
+        if transcript != UNINTELLIGIBLE
+    }
     all_entries = {**existing_data, **new_entries}
 
     # Sort entries by wav filename
@@ -168,12 +205,14 @@ def transcribe_directory(title):
         sorted(all_entries.items(), key=lambda x: int(x[0].split("_")[1]))
     )
 
-    # Write sorted entries back to the file
-    with open(output_file, "w") as out_file:
+    # Write sorted entries to a temporary file and swap it in, so metadata.json is never half written
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, "w") as out_file:
         json.dump(sorted_entries, out_file, indent=4)
+    os.replace(tmp_file, output_file)
 
     print(
-        f"Finished processing. Results sorted by transcript length written to {output_file}"
+        f"Finished processing. Results sorted by clip number written to {output_file}"
     )
 
 
@@ -181,16 +220,37 @@ def main():
     parser = argparse.ArgumentParser(description="Download and process YouTube audio")
     parser.add_argument("title", help="Title for the audio clip")
     parser.add_argument("url", help="YouTube URL of the video")
+    parser.add_argument("--sample-rate", type=int, default=TARGET_SAMPLE_RATE,
+                        help="Sample rate of the prepared audio (default: the Tacotron training rate)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes used to export clips (default: one per CPU)")
+    parser.add_argument("--recognizer", choices=sorted(BACKENDS), default="google",
+                        help="Speech recognizer; whisper runs locally without a network quota")
+    parser.add_argument("--model", default=None,
+                        help="Model for a local recognizer (default: openai/whisper-base.en)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Clips per forward pass for a local recognizer")
+    parser.add_argument("--transcribe-workers", type=int, default=None,
+                        help="Parallel transcription workers (default depends on the recognizer)")
     args = parser.parse_args()
+    # Checked before anything is downloaded
+    if args.model and not BACKENDS[args.recognizer].local:
+        parser.error(f"--model only applies to a local recognizer, not {args.recognizer}")
 
     global TITLE, VIDEO_URL
     TITLE = args.title
     VIDEO_URL = args.url
 
     update_voice_clips_json(TITLE, VIDEO_URL)
-    download_youtube_audio(VIDEO_URL, TITLE)
-    break_into_sentences(TITLE)
-    transcribe_directory(TITLE)
+    download_youtube_audio(VIDEO_URL, TITLE, sample_rate=args.sample_rate)
+    break_into_sentences(TITLE, workers=args.workers)
+
+    options = {}
+    if args.batch_size:
+        options["batch_size"] = args.batch_size
+    if args.model:
+        options["model"] = args.model
+    transcribe_directory(TITLE, args.recognizer, args.transcribe_workers, **options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Audio conditioning for training data
+Downmixes, resamples, trims and peak-normalizes a 16-bit PCM WAV in NumPy, streaming over a memory map
+"""
+
+import math
+import os
+import struct
+import wave
+
+import numpy as np
+
+# Training sample rate; matches audio_config in src/read2me/lib/finetune.py
+TARGET_SAMPLE_RATE = 22050
+
+# Output samples produced per block, so memory does not grow with the file
+BLOCK_FRAMES = 1 << 20
+
+# Zero crossings of the sinc kernel on each side; more is a sharper, slower filter
+FILTER_ZEROS = 16
+
+# Fraction of the output Nyquist frequency kept by the anti-aliasing filter
+ROLLOFF = 0.945
+
+KAISER_BETA = 8.6
+
+# Trimming looks at peaks over frames of this many milliseconds
+TRIM_FRAME_MS = 10
+
+
+def open_pcm(audio_path):
+    """Memory-map the samples of a 16-bit PCM WAV file; returns (samples, frame_rate, data_offset)"""
+    with wave.open(audio_path, "rb") as f:
+        channels, sample_width, frame_rate, n_frames = f.getparams()[:4]
+    if sample_width != 2:
+        raise ValueError(f"{audio_path}: expected 16-bit PCM, got {8 * sample_width}-bit")
+
+    # wave does not expose where the samples start, so walk the RIFF chunks
+    with open(audio_path, "rb") as f:
+        f.seek(12)
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{audio_path}: no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"data":
+                data_offset = f.tell()
+                break
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    samples = np.memmap(audio_path, dtype="<i2", mode="r", offset=data_offset,
+                        shape=(n_frames, channels))
+    return samples, frame_rate, data_offset
+
+
+def _mono(samples, start, end):
+    """Downmix of samples[start:end] as float32, zero outside the file"""
+    out = np.zeros(end - start, dtype=np.float32)
+    lo, hi = max(start, 0), min(end, len(samples))
+    if lo < hi:
+        out[lo - start:hi - start] = samples[lo:hi].mean(axis=1, dtype=np.float32)
+    return out
+
+
+def resampling_filter(in_rate, out_rate):
+    """Polyphase windowed-sinc filter bank for in_rate -> out_rate
+
+    Returns (up, down, half_width, bank): output sample n sits at input time
+    n * down / up, and bank[phase, k] weights input sample
+    floor(n * down / up) + k - half_width + 1, where phase = n * down % up.
+    """
+    g = math.gcd(in_rate, out_rate)
+    up, down = out_rate // g, in_rate // g
+    scale = min(1.0, out_rate / in_rate) * ROLLOFF  # cutoff as a fraction of the input Nyquist
+    half_width = int(math.ceil(FILTER_ZEROS / scale))
+
+    # Distance from each output position to each tap, in input samples
+    offsets = np.arange(up)[:, None] / up - (np.arange(2 * half_width)[None, :] - half_width + 1)
+    window = np.i0(KAISER_BETA * np.sqrt(np.clip(1 - (offsets / half_width) ** 2, 0, None)))
+    bank = scale * np.sinc(scale * offsets) * window / np.i0(KAISER_BETA)
+    bank /= bank.sum(axis=1, keepdims=True)  # unity gain at DC for every phase
+    return up, down, half_width, bank.astype(np.float32)
+
+
+def _resample_block(samples, start, end, n0, n1, up, down, half_width, bank):
+    """Output samples [n0, n1) of samples[start:end] resampled"""
+    positions = np.arange(n0, n1, dtype=np.int64) * down
+    base, phase = positions // up, positions % up
+    first = int(base[0]) - half_width + 1
+    source = _mono(samples, start + first, start + int(base[-1]) + half_width + 1)
+    # Zero the taps that fall outside the trimmed range
+    source[:max(0, -first)] = 0
+    source[max(0, end - start - first):] = 0
+
+    offset = base - base[0]  # tap k of output n reads source[offset[n] + k]
+    out = np.zeros(n1 - n0, dtype=np.float32)
+    for k in range(bank.shape[1]):
+        out += source[offset + k] * bank[phase, k]
+    return out
+
+
+def measure(samples, frame_rate, trim_db):
+    """Peak of the downmix and the [start, end) frames left after trimming quiet ends"""
+    frame = max(1, frame_rate * TRIM_FRAME_MS // 1000)
+    block = frame * (BLOCK_FRAMES // frame)
+    peaks = []
+    for start in range(0, len(samples), block):
+        mono = np.abs(_mono(samples, start, min(start + block, len(samples))))
+        pad = -len(mono) % frame
+        peaks.append(np.pad(mono, (0, pad)).reshape(-1, frame).max(axis=1))
+    peaks = np.concatenate(peaks) if peaks else np.zeros(0, dtype=np.float32)
+
+    peak = float(peaks.max()) if len(peaks) else 0.0
+    if peak == 0:
+        return 0.0, 0, 0
+    loud = np.flatnonzero(peaks >= peak * 10 ** (-trim_db / 20))
+    return peak, int(loud[0]) * frame, min(len(samples), (int(loud[-1]) + 1) * frame)
+
+
+def condition_audio(src, dst, sample_rate=TARGET_SAMPLE_RATE, trim_db=60.0, peak_dbfs=-1.0):
+    """Write src as a mono, sample_rate, trimmed and peak-normalized 16-bit WAV at dst
+
+    The source is only read through a memory map: once to find the peak and
+    the trim points, once to resample and write, block by block. dst is
+    written under a temporary name and renamed, so it is never partial.
+    The peak is measured before resampling, so energy above the new Nyquist
+    frequency can leave the result slightly below peak_dbfs. Returns the
+    duration written, in seconds.
+    """
+    samples, in_rate, _ = open_pcm(src)
+    peak, start, end = measure(samples, in_rate, trim_db)
+    gain = 10 ** (peak_dbfs / 20) * 32767 / peak if peak else 1.0
+
+    up, down, half_width, bank = resampling_filter(in_rate, sample_rate)
+    n_out = -(-(end - start) * up // down)
+
+    tmp_path = dst + ".tmp"
+    with wave.open(tmp_path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        for n0 in range(0, n_out, BLOCK_FRAMES):
+            n1 = min(n0 + BLOCK_FRAMES, n_out)
+            block = _resample_block(samples, start, end, n0, n1, up, down, half_width, bank)
+            block = np.clip(np.rint(block * gain), -32768, 32767).astype("<i2")
+            f.writeframes(block.tobytes())
+    os.replace(tmp_path, dst)
+    return n_out / sample_rate
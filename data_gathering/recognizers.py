@@ -0,0 +1,155 @@
+"""
+Speech recognizers for dataset transcription
+A network backend (Google Web Speech) and a local, batched Whisper backend behind one interface
+"""
+
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+# Transcript recorded for clips with no recognizable speech; they are not retried
+UNINTELLIGIBLE = "Could not understand audio"
+
+
+class Recognizer:
+    """Transcribes batches of WAV files
+
+    transcribe_batch returns one transcript per path: UNINTELLIGIBLE when there
+    is no speech, or None when the attempt failed and should be retried on the
+    next run. Local backends run in worker processes that each load() once;
+    the others run in threads.
+    """
+
+    local = False
+    default_workers = 10
+    default_batch_size = 1
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or self.default_batch_size
+
+    def load(self):
+        pass
+
+    def transcribe_batch(self, paths):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(Recognizer):
+    """Google Web Speech API via speech_recognition; needs network access and is rate limited"""
+
+    def transcribe_batch(self, paths):
+        import speech_recognition as sr
+
+        transcripts = []
+        for path in paths:
+            r = sr.Recognizer()
+            with sr.AudioFile(path) as source:
+                audio = r.record(source)
+            try:
+                transcripts.append(r.recognize_google(audio))
+            except sr.UnknownValueError:
+                transcripts.append(UNINTELLIGIBLE)
+            except sr.RequestError as e:
+                print(f"[!] Could not request results for {path}; {e}")
+                transcripts.append(None)
+        return transcripts
+
+
+class WhisperRecognizer(Recognizer):
+    """Whisper run locally through a transformers pipeline, many clips per forward pass"""
+
+    local = True
+    default_workers = max(1, (os.cpu_count() or 1) // 4)
+    default_batch_size = 16
+
+    def __init__(self, batch_size=None, model="openai/whisper-base.en", device=None, threads=None):
+        super().__init__(batch_size)
+        self.model = model
+        self.device = device
+        self.threads = threads
+        self.pipeline = None
+
+    def load(self):
+        try:
+            import torch
+            from transformers import pipeline
+        except ImportError:
+            raise ImportError("The whisper recognizer requires transformers: pip install transformers")
+
+        if self.threads:
+            # Several workers share the CPU, so each gets its own slice of cores
+            torch.set_num_threads(self.threads)
+        device = self.device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.pipeline = pipeline("automatic-speech-recognition", model=self.model, device=device)
+
+    def transcribe_batch(self, paths):
+        inputs = [read_wav(path) for path in paths]
+        outputs = self.pipeline(
+            [{"raw": samples, "sampling_rate": rate} for samples, rate in inputs],
+            batch_size=self.batch_size,
+        )
+        return [output["text"].strip() or UNINTELLIGIBLE for output in outputs]
+
+
+# name -> recognizer class
+BACKENDS = {
+    "google": GoogleRecognizer,
+    "whisper": WhisperRecognizer,
+}
+
+
+def make_recognizer(backend, **options):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown recognizer {backend!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[backend](**options)
+
+
+def read_wav(path):
+    """Mono float32 samples in [-1, 1] and the sample rate of a 16-bit PCM WAV file"""
+    with wave.open(path, "rb") as f:
+        channels, sample_width, frame_rate, n_frames = f.getparams()[:4]
+        if sample_width != 2:
+            raise ValueError(f"{path}: expected 16-bit PCM, got {8 * sample_width}-bit")
+        data = f.readframes(n_frames)
+    samples = np.frombuffer(data, dtype="<i2").reshape(-1, channels)
+    return samples.mean(axis=1, dtype=np.float32) / 32768, frame_rate
+
+
+_worker_recognizer = None  # per worker process
+
+
+def _init_worker(backend, options):
+    global _worker_recognizer
+    _worker_recognizer = make_recognizer(backend, **options)
+    _worker_recognizer.load()
+
+
+def _transcribe_in_worker(paths):
+    return _worker_recognizer.transcribe_batch(paths)
+
+
+def transcribe_files(paths, backend="google", workers=None, **options):
+    """Yield (path, transcript) for each file as its batch finishes, in completion order"""
+    recognizer = make_recognizer(backend, **options)
+    workers = workers or recognizer.default_workers
+    batches = [paths[i:i + recognizer.batch_size] for i in range(0, len(paths), recognizer.batch_size)]
+    if not batches:
+        return
+
+    if recognizer.local:
+        if "threads" not in options:
+            options = {**options, "threads": max(1, (os.cpu_count() or 1) // workers)}
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(backend, options))
+        transcribe = _transcribe_in_worker
+    else:
+        recognizer.load()
+        executor = ThreadPoolExecutor(max_workers=workers)
+        transcribe = recognizer.transcribe_batch
+
+    with executor:
+        futures = {executor.submit(transcribe, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            yield from zip(futures[future], future.result())
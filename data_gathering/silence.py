@@ -0,0 +1,80 @@
+"""
+Silence detection for splitting dataset audio
+pydub's detect_silence and split_on_silence ranges, computed in NumPy over memory-mapped samples
+"""
+
+import math
+
+import numpy as np
+
+# Audio is scanned this many milliseconds at a time, so memory does not grow with the file
+SCAN_BLOCK_MS = 60_000
+
+
+def detect_silence(samples, frame_rate, min_silence_len, silence_thresh, block_ms=SCAN_BLOCK_MS):
+    """[start_ms, end_ms] ranges where every min_silence_len window is below silence_thresh dBFS
+
+    Same rule as pydub's detect_silence with a 1 ms step (window RMS against the
+    threshold as a fraction of full scale, and silent windows starting no more
+    than min_silence_len apart joined into one range), computed from a running
+    sum of squares over the memory-mapped samples one block at a time.
+    """
+    length_ms = int(round(len(samples) * 1000 / frame_rate))
+    last_start = length_ms - min_silence_len
+    if last_start < 0:
+        return []
+    # pydub compares the integer part of the RMS, so a window is silent below the next integer
+    thresh_energy = (math.floor(10 ** (silence_thresh / 20) * 32768) + 1) ** 2
+
+    ranges = []
+    for block_start in range(0, last_start + 1, block_ms):
+        block_end = min(block_start + block_ms, last_start + 1)  # window starts in this block
+
+        # Per-millisecond sums of squares for every millisecond those windows cover
+        frame_bounds = np.arange(block_start, block_end + min_silence_len) * frame_rate // 1000
+        bounds = np.minimum(frame_bounds, len(samples))
+        block = samples[bounds[0]:bounds[-1]].astype(np.float64)
+        # RMS is over every sample, so average the squares across channels
+        frame_energy = (block * block).mean(axis=1)
+        cumulative = np.concatenate(([0.0], np.cumsum(frame_energy)))
+        energy = cumulative[bounds - bounds[0]]
+
+        # Windows are min_silence_len milliseconds long; past the end pydub pads them with zeros
+        window_energy = energy[min_silence_len:] - energy[:-min_silence_len]
+        window_frames = frame_bounds[min_silence_len:] - frame_bounds[:-min_silence_len]
+        silent = window_energy < thresh_energy * np.maximum(window_frames, 1)
+
+        # Runs of silent window starts become silent ranges; like pydub, a run starting within
+        # min_silence_len of the previous silent window joins its range, also across blocks
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+        for run_start, run_end in zip(edges[::2] + block_start, edges[1::2] + block_start):
+            if ranges and run_start <= ranges[-1][1]:
+                ranges[-1][1] = int(run_end - 1 + min_silence_len)
+            else:
+                ranges.append([int(run_start), int(run_end - 1 + min_silence_len)])
+    return ranges
+
+
+def split_ranges(length_ms, silent_ranges, keep_silence):
+    """Chunk [start_ms, end_ms] ranges between the silences, padded like pydub's split_on_silence"""
+    if not silent_ranges:
+        nonsilent = [[0, length_ms]]
+    elif silent_ranges[0] == [0, length_ms]:
+        return []
+    else:
+        nonsilent = []
+        prev_end = 0
+        for start, end in silent_ranges:
+            nonsilent.append([prev_end, start])
+            prev_end = end
+        if prev_end != length_ms:
+            nonsilent.append([prev_end, length_ms])
+        if nonsilent[0] == [0, 0]:
+            nonsilent.pop(0)
+
+    output = [[start - keep_silence, end + keep_silence] for start, end in nonsilent]
+    # Padding that would overlap the next chunk is split between the two
+    for current, following in zip(output, output[1:]):
+        if following[0] < current[1]:
+            current[1] = following[0] = (current[1] + following[0]) // 2
+    return [(max(start, 0), min(end, length_ms)) for start, end in output]
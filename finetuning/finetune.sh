@@ -1,3 +1,4 @@
-CUDA_VISIBLE_DEVICES="0" python3 tacotron.py \
-    --coqpit.lr 0.00000001 \
-    --restore_path  /home/tristan/.local/share/tts/tts_models--en--ljspeech--tacotron2-DDC/model_file.pth
\ No newline at end of file
+# Add --procs N to train in N processes (DDP over gloo); --resume continues run-steve_jobs
+read2me finetune ../data/audio/steve_jobs \
+    --lr 0.00000001 \
+    --restore-path /home/tristan/.local/share/tts/tts_models--en--ljspeech--tacotron2-DDC/model_file.pth
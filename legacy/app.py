@@ -9,6 +9,7 @@ from celery_worker import clone_voice, generate_tts
 import logging
 from flask_httpauth import HTTPBasicAuth
 from werkzeug.security import generate_password_hash, check_password_hash
+from read2me.api.file_serving import configure_file_serving, serve_file
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -16,6 +17,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 cors = CORS(app) # allow CORS for all domains on all routes.
 app.config['CORS_HEADERS'] = 'Content-Type'
+configure_file_serving(app)  # Range/ETag support via serve_file, optional X-Sendfile
 
 # Add authentication setup
 auth = HTTPBasicAuth()
@@ -74,28 +76,38 @@ def name_transcriptions(name):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# metadata.json path -> (mtime, parsed metadata), so repeated requests skip unchanged files
+_metadata_cache = {}
+
+def load_metadata(path):
+    mtime = os.stat(path).st_mtime_ns
+    cached = _metadata_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'r') as f:
+            cached = (mtime, json.load(f))
+        _metadata_cache[path] = cached
+    return cached[1]
+
 @app.route("/api/v1/audio/tree", methods=["GET"])
 @auth.login_required
 def tree():
     tree = {}
     for name in os.listdir("data/audio/"):
-        # Read the metadata.json file for each name
-        with open(f"data/audio/{name}/metadata.json", 'r') as f:
-            tree[name] = json.loads(f.read())
+        # Read the metadata.json file for each name (cached until it changes)
+        tree[name] = load_metadata(f"data/audio/{name}/metadata.json")
     return jsonify(tree)
 
 @app.route("/api/v1/audio/<name>/<track>", methods=["GET"])
 @auth.login_required
 def get_track(name, track):
     print(f"data/audio/{name}/wavs/{track}.wav")
-    return send_file(f"data/audio/{name}/wavs/{track}.wav")
+    return serve_file(f"data/audio/{name}/wavs/{track}.wav")
 
 @app.route("/api/v1/audio/<name>/<track>/transcription", methods=["GET"])
 @auth.login_required
 def get_track_transcription(name, track):
     # get the transcription from the metadata.json file
-    with open(f"data/audio/{name}/metadata.json", 'r') as f:
-        metadata = json.loads(f.read())
+    metadata = load_metadata(f"data/audio/{name}/metadata.json")
     return jsonify(metadata[track])
 
 @app.route("/api/v1/samples/<name>")
@@ -104,7 +116,7 @@ def samples(name):
     name = name.replace("_", " ")
     name = " ".join(word.capitalize() for word in name.split(" "))
     print(name)
-    return send_file(f"voice_samples/{name}.wav")
+    return serve_file(f"voice_samples/{name}.wav")
 
 # Voice Cloning
 
@@ -142,7 +154,7 @@ def clone_status(task_id):
 def get_clone_result(task_id):
     output_path = f"output/{task_id}.wav"
     if os.path.exists(output_path):
-        return send_file(output_path)
+        return serve_file(output_path)
     return jsonify({"error": "File not found"}), 404
 
 # Generic transcription
@@ -173,7 +185,7 @@ def tts():
 def retrieve(task_id):
     output_path = f"output/{task_id}.wav"
     if os.path.exists(output_path):
-        return send_file(output_path)
+        return serve_file(output_path)
     return jsonify({"error": "File not found"}), 404
 
 @app.route("/api/v1/retrieve")
@@ -220,7 +232,7 @@ def book(book_name):
 @app.route("/api/v1/books/<book_name>/<chapter_name>")
 @auth.login_required
 def chapter(book_name, chapter_name):
-    return send_file(f"data/split_books/{book_name}/{chapter_name}")
+    return serve_file(f"data/split_books/{book_name}/{chapter_name}")
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=9930)
\ No newline at end of file
@@ -1,28 +1,101 @@
 from celery import Celery
+from celery.signals import celeryd_init, worker_process_init
+from billiard import current_process
 import os
-import subprocess
-import shlex
+import json
+import fcntl
+
+# Count GPUs through NVML: the prefork parent must not initialize CUDA before the workers fork
+os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
 
 # Initialize Celery with Redis as broker
 celery = Celery('tasks', broker='redis://localhost:6379/0')
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_FILE = os.path.join(BASE_DIR, "generation_log.json")
+
+# Threads each worker process gives to torch; workers * threads should not exceed the cores
+THREADS_PER_WORKER = int(os.environ.get("READ2ME_THREADS_PER_WORKER", "4"))
+
+def default_concurrency():
+    """One worker per GPU, otherwise one worker per THREADS_PER_WORKER cores; never initializes CUDA"""
+    import torch
+    if torch.cuda.is_available():
+        return torch.cuda.device_count()
+    return max(1, (os.cpu_count() or 1) // THREADS_PER_WORKER)
+
+celery.conf.update(
+    # Each task holds a whole model; never reserve more work than a process is running
+    worker_prefetch_multiplier=int(os.environ.get("READ2ME_WORKER_PREFETCH", "1")),
+    task_acks_late=True,
+    worker_max_tasks_per_child=int(os.environ.get("READ2ME_MAX_TASKS_PER_CHILD", "0")) or None,
+)
+
+generator = None
+
+@celeryd_init.connect
+def configure_worker(conf=None, **kwargs):
+    """Size the pool in the worker only, so clients such as app.py never import torch"""
+    concurrency = os.environ.get("READ2ME_WORKER_CONCURRENCY")
+    conf.worker_concurrency = int(concurrency) if concurrency else default_concurrency()
+
+@worker_process_init.connect
+def load_model(**kwargs):
+    """Load the TTS model once per worker process"""
+    global generator
+    import torch
+    from read2me import AudiobookGenerator
+
+    index = getattr(current_process(), "index", 0) or 0
+    if torch.cuda.is_available():
+        device = f"cuda:{index % torch.cuda.device_count()}"
+    else:
+        device = "cpu"
+        torch.set_num_threads(THREADS_PER_WORKER)
+
+    generator = AudiobookGenerator(output_dir="output", device=device)
+    generator._init_tts()
+
+def get_generator():
+    # Also covers solo/threads pools where worker_process_init never fires
+    if generator is None:
+        load_model()
+    return generator
+
+def append_generation_log(task_id, entry):
+    """Add an entry to generation_log.json, serialized across worker processes"""
+    with open(LOG_FILE + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(LOG_FILE, "r") as f:
+                log_data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            log_data = {}
+
+        log_data[task_id] = entry
+
+        with open(LOG_FILE, "w") as f:
+            json.dump(log_data, f, indent=4)
+
 @celery.task(bind=True)
 def clone_voice(self, name, source_filename, input_text):
     source_wav = os.path.join("data/audio", name, "wavs", f"{source_filename}.wav")
-    output_path = f"output/{self.request.id}.wav"
-    
-    # Create output directory if it doesn't exist
-    os.makedirs("output", exist_ok=True)
-    
-    # Use subprocess.run instead of os.system
-    subprocess.run([
-        "python3",
-        "endpoints/clone-voice.py",
-        source_wav,
-        input_text,
-        self.request.id
-    ])
-    
+    output_file = f"{self.request.id}.wav"
+    output_path = f"output/{output_file}"
+
+    get_generator().generate_audio(
+        text=input_text,
+        voice_file=source_wav,
+        output_filename=output_file
+    )
+
+    append_generation_log(self.request.id, {
+        "voice": name,
+        "source_file": source_wav,
+        "input_text": input_text,
+        "output_file": output_file
+    })
+
     return {
         'task_id': self.request.id,
         'status': 'completed',
@@ -31,19 +104,27 @@ def clone_voice(self, name, source_filename, input_text):
 
 @celery.task(bind=True)
 def generate_tts(self, input_filename):
-    output_path = f"output/{self.request.id}.wav"
-    
-    print("!!! INPUT FILENAME ", input_filename)
-    print("!!! TASK ID ", self.request.id)
-    
-    subprocess.run([
-        "python3",
-        "endpoints/tts.py",
-        input_filename,
-        self.request.id
-    ])
+    output_file = f"{self.request.id}.wav"
+    output_path = f"output/{output_file}"
+
+    with open(input_filename, "r", encoding="utf-8") as f:
+        input_text = f.read()
+
+    get_generator().generate_audio(
+        text=input_text,
+        voice="Ana Florence",
+        output_filename=output_file
+    )
+
+    append_generation_log(self.request.id, {
+        "voice": "Ana Florence",
+        "source_file": None,
+        "input_file": input_filename,
+        "output_file": output_file
+    })
+
     return {
         'task_id': self.request.id,
         'status': 'completed',
         'output_path': output_path
-    }
\ No newline at end of file
+    }
@@ -1 +1,6 @@
-nohup celery -A celery_worker worker --loglevel=INFO &
\ No newline at end of file
+#!/bin/bash
+
+# Prefork workers load the TTS model once in worker_process_init and keep it resident.
+# Concurrency and prefetch come from READ2ME_WORKER_CONCURRENCY / READ2ME_WORKER_PREFETCH
+# (see celery_worker.py); defaults avoid oversubscribing the GPU or CPU cores.
+nohup celery -A celery_worker worker --pool=prefork --loglevel=INFO &
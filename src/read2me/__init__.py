@@ -2,8 +2,31 @@
 Read2Me - Simple audiobook generation toolkit
 """
 
-from .lib.read2me_lib import AudiobookGenerator, quick_tts, book_to_audio
-from .api.bookshelf_integration import BookshelfConnector
+import importlib
 
 __version__ = "1.0.0"
-__all__ = ["AudiobookGenerator", "quick_tts", "book_to_audio", "BookshelfConnector"]
\ No newline at end of file
+__all__ = ["AudiobookGenerator", "quick_tts", "book_to_audio", "BookshelfConnector",
+           "ModelRegistry", "get_registry"]
+
+# Public name -> defining module; imported on first access so that light submodules
+# (e.g. read2me.api.file_serving) don't pull in torch and TTS
+_EXPORTS = {
+    "AudiobookGenerator": ".lib.read2me_lib",
+    "quick_tts": ".lib.read2me_lib",
+    "book_to_audio": ".lib.read2me_lib",
+    "ModelRegistry": ".lib.model_registry",
+    "get_registry": ".lib.model_registry",
+    "BookshelfConnector": ".api.bookshelf_integration",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
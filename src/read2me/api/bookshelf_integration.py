@@ -3,30 +3,71 @@ Bookshelf Integration Module for Read2Me
 Simple web API wrapper for audiobook generation
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from werkzeug.exceptions import BadRequest
 import os
 import json
-import threading
+import itertools
+import time
 from pathlib import Path
 from typing import Dict, Optional
+from ..lib.encoding import CHAPTER_FORMATS
+from ..lib.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, get_metrics
+from ..lib.progress import ProgressEvent
 from ..lib.read2me_lib import AudiobookGenerator
+from ..lib.segment_cache import SegmentCache
+from ..lib.streaming import STREAM_FORMATS
+from .events import TERMINAL_STATUSES, ProgressBroker, iter_sse
+from .file_serving import configure_file_serving, serve_file
+from .job_store import JobStore, SQLiteJobStore
+from .scheduler import JobScheduler, QueueFullError, default_workers, worker_devices
 
 class BookshelfAudioAPI:
     """Simple API wrapper for Bookshelf integration"""
     
-    def __init__(self, output_dir: str = "audiobooks"):
-        self.generator = AudiobookGenerator(output_dir=output_dir)
-        self.active_jobs = {}  # job_id -> status/progress
+    def __init__(self, output_dir: str = "audiobooks", job_store: Optional[JobStore] = None,
+                 workers: Optional[int] = None, max_queue: int = 64, output_format: str = "wav"):
+        # Books are often regenerated with small edits; only changed sentences are re-synthesized
+        segment_cache = SegmentCache(os.path.join(output_dir, ".segment_cache.db"))
+        # One generator per worker; with several GPUs each is pinned to its own device and model
+        workers = workers or default_workers()
+        self.generators = [
+            AudiobookGenerator(output_dir=output_dir, device=device, segment_cache=segment_cache)
+            for device in worker_devices(workers)
+        ]
+        self.generator = self.generators[0]
+        # Shared by every API worker on the host, so any of them can answer status requests
+        self.jobs = job_store or SQLiteJobStore(os.path.join(output_dir, "jobs.db"))
+        if isinstance(self.jobs, SQLiteJobStore):
+            self.jobs.fail_orphaned()
+        # Default chapter format; "opus" or "mp3" cut storage and egress to a few percent of WAV
+        self.output_format = output_format
+        # Pushes progress to SSE and long-poll clients instead of making them poll /status
+        self.progress = ProgressBroker()
+        # Fixed pool sized to the hardware instead of a thread per request
+        self.scheduler = JobScheduler(self._generate_audiobook, workers=workers, max_queue=max_queue)
         
     def create_job(self, text: str, title: str, voice: Optional[str] = None, 
-                   voice_file: Optional[str] = None, language: str = "en") -> str:
-        """Create audiobook generation job"""
+                   voice_file: Optional[str] = None, language: str = "en",
+                   user: str = "anonymous", output_format: Optional[str] = None,
+                   m4b: bool = False) -> str:
+        """Create audiobook generation job; raises QueueFullError when the queue is full"""
+        # Cost = characters to synthesize
+        return self._submit_job(user, len(text), title, voice, voice_file, language,
+                                output_format, m4b, text=text)
+    
+    def _submit_job(self, user: str, cost: int, title: str, voice: Optional[str],
+                    voice_file: Optional[str], language: str, output_format: Optional[str],
+                    m4b: bool, text: Optional[str] = None, file_path: Optional[str] = None) -> str:
+        """Record a pending job and queue it on the bounded worker pool"""
         import uuid
         job_id = str(uuid.uuid4())
+        output_format = output_format or self.output_format
+        if output_format not in CHAPTER_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
         
         # Initialize job status
-        self.active_jobs[job_id] = {
+        self.jobs.create(job_id, {
             "status": "pending",
             "progress": "Job created",
             "title": title,
@@ -34,100 +75,211 @@ class BookshelfAudioAPI:
             "language": language,
             "result": None,
             "error": None
-        }
+        })
         
-        # Start generation in background thread
-        thread = threading.Thread(
-            target=self._generate_audiobook,
-            args=(job_id, text, title, voice, voice_file, language)
-        )
-        thread.daemon = True
-        thread.start()
+        try:
+            self.scheduler.submit(user, cost, job_id, text, title, voice, voice_file, language,
+                                  file_path, output_format, m4b)
+        except QueueFullError:
+            self.jobs.delete(job_id)
+            raise
         
         return job_id
     
     def create_job_from_file(self, file_path: str, voice: Optional[str] = None,
-                           voice_file: Optional[str] = None, language: str = "en") -> str:
-        """Create audiobook generation job from file"""
-        import uuid
-        job_id = str(uuid.uuid4())
+                           voice_file: Optional[str] = None, language: str = "en",
+                           user: str = "anonymous", output_format: Optional[str] = None,
+                           m4b: bool = False) -> str:
+        """Create audiobook generation job from file
         
+        The file is streamed into the generator when the job runs rather than read
+        up front, so large books are never held in memory by the API.
+        """
         file_path = Path(file_path)
         title = file_path.stem
         
-        # Read file
+        # Check the file is readable now so the caller gets an immediate failed job
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
+            with open(file_path, 'r', encoding='utf-8'):
+                pass
+            file_size = file_path.stat().st_size
         except Exception as e:
+            import uuid
+            job_id = str(uuid.uuid4())
             # Create failed job
-            self.active_jobs[job_id] = {
+            self.jobs.create(job_id, {
                 "status": "failed",
                 "progress": f"Failed to read file: {e}",
                 "title": title,
                 "error": str(e)
-            }
+            })
             return job_id
         
-        return self.create_job(text, title, voice, voice_file, language)
+        # File size in bytes approximates the characters to synthesize
+        return self._submit_job(user, file_size, title, voice, voice_file, language,
+                                output_format, m4b, file_path=str(file_path))
     
     def get_job_status(self, job_id: str) -> Dict:
         """Get job status and progress"""
-        if job_id not in self.active_jobs:
+        job = self.jobs.get(job_id)
+        if job is None:
             return {"error": "Job not found"}
-        return self.active_jobs[job_id]
+        return job
+    
+    def get_job_event(self, job_id: str) -> Optional[Dict]:
+        """Latest progress event of a job (a minimal one if it has not reported any), or None"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return job.get("progress_event") or {
+            "seq": 0, "status": job["status"], "message": job.get("progress")
+        }
+    
+    def wait_for_progress(self, job_id: str, since: int, timeout: float) -> Dict:
+        """Job status once it has progress newer than event seq since, or after timeout (long-poll)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            # Short waits so jobs run by another process on the host are picked up from the store
+            self.progress.wait(job_id, since, max(0.0, min(remaining, 1.0)))
+            job = self.get_job_status(job_id)
+            if "status" not in job or job["status"] in TERMINAL_STATUSES:
+                return job  # Not found, or finished
+            if (job.get("progress_event") or {}).get("seq", 0) > since or remaining <= 1.0:
+                return job
     
     def get_job_result(self, job_id: str) -> Optional[str]:
         """Get job result file path"""
-        if job_id not in self.active_jobs:
+        job = self.jobs.get(job_id)
+        if job is None:
             return None
         
-        job = self.active_jobs[job_id]
         if job["status"] == "completed" and job["result"]:
             return job["result"]["output_directory"]
         return None
     
+    def get_chapter_file(self, job_id: str, chapter_num: int) -> Optional[str]:
+        """Path of one chapter's audio (whatever format it was encoded in)"""
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "completed" or not job["result"]:
+            return None
+        for audio_file in job["result"]["audio_files"]:
+            if audio_file["chapter"] == chapter_num:
+                return audio_file["path"]
+        return None
+    
+    def get_m4b_file(self, job_id: str) -> Optional[str]:
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "completed" or not job["result"]:
+            return None
+        return job["result"].get("m4b")
+    
     def list_voices(self) -> list:
         """List available voices"""
         return self.generator.get_available_voices()
     
-    def _generate_audiobook(self, job_id: str, text: str, title: str, 
-                          voice: Optional[str], voice_file: Optional[str], language: str):
-        """Generate audiobook in background thread"""
+    def stream(self, text: str, voice: Optional[str] = None, voice_file: Optional[str] = None,
+               language: str = "en", audio_format: str = "pcm"):
+        """Iterator of audio chunks, one per synthesized sentence"""
+        return self.generator.stream_audio(
+            text=text,
+            voice=voice,
+            voice_file=voice_file,
+            language=language,
+            audio_format=audio_format
+        )
+    
+    def _generate_audiobook(self, job_id: str, text: Optional[str], title: str, 
+                          voice: Optional[str], voice_file: Optional[str], language: str,
+                          file_path: Optional[str] = None, output_format: str = "wav",
+                          m4b: bool = False):
+        """Generate audiobook in background thread from text or a streamed file"""
+        worker = self.scheduler.current_worker()
+        generator = self.generators[worker] if worker is not None else self.generator
+        seq = itertools.count(1)
+        last_event = {}
+        
+        def report(status: str, event: Dict, **fields):
+            # Stored for /status and other processes, then pushed to waiting clients
+            event = {**event, "seq": next(seq), "job_id": job_id, "status": status}
+            last_event.clear()
+            last_event.update(event)
+            self.jobs.update(job_id, status=status, progress=event["message"], progress_event=event,
+                             **fields)
+            self.progress.publish(job_id, event)
+        
         def progress_callback(message: str):
-            if job_id in self.active_jobs:
-                self.active_jobs[job_id]["progress"] = message
+            event = message.to_dict() if isinstance(message, ProgressEvent) else {"message": message}
+            report("processing", event)
         
         try:
-            self.active_jobs[job_id]["status"] = "processing"
+            report("processing", {"message": "Processing"})
             
-            result = self.generator.create_audiobook(
-                text=text,
-                title=title,
-                voice=voice,
-                voice_file=voice_file,
-                language=language,
-                progress_callback=progress_callback
-            )
+            if file_path:
+                result = generator.create_audiobook_from_file(
+                    file_path=file_path,
+                    voice=voice,
+                    voice_file=voice_file,
+                    language=language,
+                    progress_callback=progress_callback,
+                    output_format=output_format,
+                    m4b=m4b,
+                    pipeline=True
+                )
+            else:
+                result = generator.create_audiobook(
+                    text=text,
+                    title=title,
+                    voice=voice,
+                    voice_file=voice_file,
+                    language=language,
+                    progress_callback=progress_callback,
+                    output_format=output_format,
+                    m4b=m4b,
+                    pipeline=True
+                )
             
-            self.active_jobs[job_id]["status"] = "completed"
-            self.active_jobs[job_id]["result"] = result
-            self.active_jobs[job_id]["progress"] = "Completed successfully"
+            report("completed", {**last_event, "message": "Completed successfully"}, result=result)
             
         except Exception as e:
-            self.active_jobs[job_id]["status"] = "failed"
-            self.active_jobs[job_id]["error"] = str(e)
-            self.active_jobs[job_id]["progress"] = f"Failed: {e}"
+            report("failed", {**last_event, "message": f"Failed: {e}"}, error=str(e))
 
 # Flask app for web integration
-def create_app(output_dir: str = "audiobooks") -> Flask:
+def create_app(output_dir: str = "audiobooks", output_format: str = "wav") -> Flask:
     """Create Flask app for Bookshelf integration"""
     app = Flask(__name__)
-    api = BookshelfAudioAPI(output_dir=output_dir)
+    configure_file_serving(app)
+    api = BookshelfAudioAPI(output_dir=output_dir, output_format=output_format)
+    
+    @app.errorhandler(QueueFullError)
+    def queue_full(e):
+        response = jsonify({"error": "Job queue is full", "retry_after": e.retry_after})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    
+    def request_user(data: Dict) -> str:
+        """User for fair-share scheduling: X-User-Id header, 'user' field, or client address"""
+        return request.headers.get('X-User-Id') or data.get('user') or request.remote_addr or "anonymous"
+    
+    def request_output_format(data: Dict) -> Optional[str]:
+        output_format = data.get('output_format')
+        if output_format is not None and output_format not in CHAPTER_FORMATS:
+            raise BadRequest(f"Unsupported output_format: {output_format}")
+        return output_format
     
     @app.route('/health', methods=['GET'])
     def health():
-        return jsonify({"status": "ok"})
+        return jsonify({"status": "ok", "queue": api.scheduler.stats()})
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus scrape endpoint: stage timings, throughput and queue depths"""
+        stats = api.scheduler.stats()
+        pipeline_metrics = get_metrics()
+        pipeline_metrics.queue_depth.set(stats["queued"], queue="jobs")
+        pipeline_metrics.queue_depth.set(stats["running"], queue="jobs_running")
+        return Response(pipeline_metrics.render(), content_type=METRICS_CONTENT_TYPE)
     
     @app.route('/voices', methods=['GET'])
     def list_voices():
@@ -144,7 +296,10 @@ def create_app(output_dir: str = "audiobooks") -> Flask:
             title=data['title'],
             voice=data.get('voice'),
             voice_file=data.get('voice_file'),
-            language=data.get('language', 'en')
+            language=data.get('language', 'en'),
+            user=request_user(data),
+            output_format=request_output_format(data),
+            m4b=bool(data.get('m4b', False))
         )
         
         return jsonify({
@@ -163,7 +318,10 @@ def create_app(output_dir: str = "audiobooks") -> Flask:
             file_path=data['file_path'],
             voice=data.get('voice'),
             voice_file=data.get('voice_file'),
-            language=data.get('language', 'en')
+            language=data.get('language', 'en'),
+            user=request_user(data),
+            output_format=request_output_format(data),
+            m4b=bool(data.get('m4b', False))
         )
         
         return jsonify({
@@ -172,11 +330,53 @@ def create_app(output_dir: str = "audiobooks") -> Flask:
             "message": "Audiobook generation started"
         })
     
+    @app.route('/stream', methods=['GET', 'POST'])
+    def stream_audio():
+        # GET (query string) lets an <audio> element play the stream directly
+        data = request.get_json(silent=True) if request.method == 'POST' else request.args
+        if not data or 'text' not in data:
+            raise BadRequest("Missing required field: text")
+        
+        audio_format = data.get('format', 'wav')
+        if audio_format not in STREAM_FORMATS:
+            raise BadRequest(f"Unsupported format: {audio_format}")
+        
+        chunks = api.stream(
+            text=data['text'],
+            voice=data.get('voice'),
+            voice_file=data.get('voice_file'),
+            language=data.get('language', 'en'),
+            audio_format=audio_format
+        )
+        
+        mimetype = STREAM_FORMATS[audio_format]
+        if audio_format == 'pcm':
+            mimetype += f";rate={api.generator.tts.synthesizer.output_sample_rate};channels=1"
+        
+        # No Content-Length, so the response goes out with chunked transfer encoding
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    
     @app.route('/status/<job_id>', methods=['GET'])
     def get_status(job_id):
+        # Long-poll: ?since=<seq> waits (up to ?wait= seconds, max 60) for a newer progress event
+        since = request.args.get('since', type=int)
+        if since is not None:
+            timeout = min(max(request.args.get('wait', 30, type=float), 0), 60)
+            return jsonify(api.wait_for_progress(job_id, since, timeout))
         status = api.get_job_status(job_id)
         return jsonify(status)
     
+    @app.route('/events/<job_id>', methods=['GET'])
+    def job_events(job_id):
+        """Server-Sent Events stream of a job's progress, ending when it completes or fails"""
+        if api.get_job_event(job_id) is None:
+            return jsonify({"error": "Job not found"}), 404
+        last_seq = request.headers.get('Last-Event-ID', type=int) or 0
+        events = iter_sse(api.progress, lambda: api.get_job_event(job_id), job_id, last_seq)
+        return Response(stream_with_context(events), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    
     @app.route('/download/<job_id>', methods=['GET'])
     def download_audiobook(job_id):
         result_path = api.get_job_result(job_id)
@@ -196,13 +396,21 @@ def create_app(output_dir: str = "audiobooks") -> Flask:
         if not result_path:
             return jsonify({"error": "Audiobook not ready or job not found"}), 404
         
-        # Find chapter file
-        chapter_file = Path(result_path) / f"chapter_{chapter_num:02d}.wav"
-        if chapter_file.exists():
-            return send_file(str(chapter_file))
+        # Find chapter file (WAV, Opus or MP3 depending on the job's output format)
+        chapter_file = api.get_chapter_file(job_id, chapter_num)
+        if chapter_file and Path(chapter_file).exists():
+            return serve_file(chapter_file)
         
         return jsonify({"error": "Chapter not found"}), 404
     
+    @app.route('/download/<job_id>/m4b', methods=['GET'])
+    def download_m4b(job_id):
+        m4b_file = api.get_m4b_file(job_id)
+        if m4b_file and Path(m4b_file).exists():
+            return serve_file(m4b_file)
+        
+        return jsonify({"error": "M4B not found (request it with \"m4b\": true)"}), 404
+    
     return app
 
 # Example usage for Bookshelf integration
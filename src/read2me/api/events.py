@@ -0,0 +1,81 @@
+"""
+Job progress events
+Wakes SSE and long-poll requests as soon as a job in this process reports progress
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional
+
+# Statuses after which a job reports no more progress
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class ProgressBroker:
+    """Latest progress event per job, with waiting for a newer one
+
+    Events are cumulative (each one carries the job's full progress), so only
+    the latest is kept and a slow client simply skips intermediate ones.
+    """
+
+    def __init__(self, max_jobs: int = 1024):
+        self.max_jobs = max_jobs
+        self._events = OrderedDict()  # job_id -> latest event
+        self._cond = threading.Condition()
+
+    def publish(self, job_id: str, event: Dict):
+        with self._cond:
+            self._events[job_id] = event
+            self._events.move_to_end(job_id)
+            while len(self._events) > self.max_jobs:
+                self._events.popitem(last=False)
+            self._cond.notify_all()
+
+    def wait(self, job_id: str, after_seq: int, timeout: float) -> Optional[Dict]:
+        """The job's latest event once its seq is past after_seq, or None on timeout"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                event = self._events.get(job_id)
+                if event is not None and event["seq"] > after_seq:
+                    return event
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+
+def sse_message(event: Dict) -> str:
+    """One Server-Sent Events message; the id lets a reconnecting client resume via Last-Event-ID"""
+    return f"id: {event['seq']}\nevent: progress\ndata: {json.dumps(event)}\n\n"
+
+
+def iter_sse(broker: ProgressBroker, load_event, job_id: str, last_seq: int = 0,
+             poll_interval: float = 5.0, heartbeat: float = 15.0) -> Iterator[str]:
+    """SSE stream of a job's progress until it completes or fails
+
+    load_event() reads the stored event (None once the job is gone), which
+    covers jobs run by another process on the host: those are seen every
+    poll_interval seconds rather than immediately.
+    """
+    last_sent = time.monotonic()
+    while True:
+        event = broker.wait(job_id, last_seq, poll_interval)
+        if event is None:
+            stored = load_event()
+            if stored is None:
+                return  # Job expired or deleted
+            if stored["seq"] > last_seq or stored.get("status") in TERMINAL_STATUSES:
+                event = stored
+        if event is not None:
+            last_seq = event["seq"]
+            last_sent = time.monotonic()
+            yield sse_message(event)
+            if event.get("status") in TERMINAL_STATUSES:
+                return
+        elif time.monotonic() - last_sent >= heartbeat:
+            # Comment line; keeps proxies from closing an idle connection
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
@@ -0,0 +1,67 @@
+"""
+File serving for generated audio
+Range-aware, conditional responses validated by content-hash ETags, so seeking only costs the bytes requested
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from flask import Flask, Response, send_file
+
+from ..lib.encoding import mimetype_for
+
+# Outputs are replaced atomically rather than rewritten, so clients may cache them
+DEFAULT_MAX_AGE = 3600
+
+_etag_cache = {}  # resolved path -> (size, mtime_ns, etag)
+_etag_lock = threading.Lock()
+
+
+def content_etag(path: str) -> str:
+    """Hash of the file's contents, recomputed only when its size or mtime changes"""
+    key = str(Path(path).resolve())
+    stat = os.stat(key)
+    with _etag_lock:
+        cached = _etag_cache.get(key)
+    if cached is not None and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(key, "rb") as f:
+        if stat.st_size:
+            # Hash straight from the page cache instead of copying the file through read buffers
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+    etag = digest.hexdigest()
+    with _etag_lock:
+        _etag_cache[key] = (stat.st_size, stat.st_mtime_ns, etag)
+    return etag
+
+
+def serve_file(path: str, mimetype: Optional[str] = None, as_attachment: bool = False,
+               max_age: Optional[int] = DEFAULT_MAX_AGE) -> Response:
+    """send_file with Range, If-None-Match/If-Modified-Since and If-Range support
+
+    Werkzeug answers a Range request by seeking in the file and returning 206
+    with only that span; full responses go out through the WSGI server's
+    file_wrapper (sendfile under gunicorn/uWSGI). With X-Sendfile enabled (see
+    configure_file_serving) the front-end proxy serves the body and ranges.
+    """
+    return send_file(
+        path,
+        mimetype=mimetype or mimetype_for(path),
+        as_attachment=as_attachment,
+        conditional=True,
+        etag=content_etag(path),
+        last_modified=os.stat(path).st_mtime,
+        max_age=max_age
+    )
+
+
+def configure_file_serving(app: Flask):
+    """Hand file bodies to the front-end proxy when READ2ME_X_SENDFILE=1 (nginx/Apache X-Sendfile)"""
+    app.config["USE_X_SENDFILE"] = os.environ.get("READ2ME_X_SENDFILE", "0") == "1"
@@ -0,0 +1,207 @@
+"""
+Job stores for the Bookshelf API
+Durable, shareable job status storage (SQLite by default) with TTL garbage collection
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class JobStore(ABC):
+    """Interface for job status storage shared by API workers"""
+
+    @abstractmethod
+    def create(self, job_id: str, job: Dict):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def list(self, status: Optional[str] = None) -> List[Dict]:
+        ...
+
+    @abstractmethod
+    def gc(self) -> int:
+        """Remove finished jobs older than the TTL; returns the number removed"""
+        ...
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+
+class MemoryJobStore(JobStore):
+    """Process-local store, for tests and single-process use"""
+
+    def __init__(self, ttl: float = 7 * 24 * 3600):
+        self.ttl = ttl
+        self._jobs = {}  # job_id -> job dict
+        self._updated_at = {}  # job_id -> timestamp
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job: Dict):
+        with self._lock:
+            self._jobs[job_id] = dict(job)
+            self._updated_at[job_id] = time.time()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+                self._updated_at[job_id] = time.time()
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._updated_at.pop(job_id, None)
+
+    def list(self, status: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            return [dict(job, job_id=job_id) for job_id, job in self._jobs.items()
+                    if status is None or job.get("status") == status]
+
+    def gc(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.get("status") in FINISHED_STATUSES and self._updated_at[job_id] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+                del self._updated_at[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite-backed store that survives restarts and is shared by every worker on the host"""
+
+    def __init__(self, path: str = "jobs.db", ttl: float = 7 * 24 * 3600,
+                 gc_interval: float = 600):
+        self.path = path
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self._last_gc = 0.0
+        self._local = threading.local()
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL keeps status reads from waiting on writers"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, job: Dict):
+        now = time.time()
+        job = {**job, "owner": f"{socket.gethostname()}:{os.getpid()}"}
+        self._connect().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, status, data, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (job_id, job.get("status", "pending"), json.dumps(job), now, now)
+        )
+        if now - self._last_gc > self.gc_interval:
+            self.gc()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields):
+        conn = self._connect()
+        # Read-modify-write under a write lock so concurrent updates are not lost
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is not None:
+                job = json.loads(row[0])
+                job.update(fields)
+                conn.execute(
+                    "UPDATE jobs SET status = ?, data = ?, updated_at = ? WHERE job_id = ?",
+                    (job.get("status", "pending"), json.dumps(job), time.time(), job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, job_id: str):
+        self._connect().execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def list(self, status: Optional[str] = None) -> List[Dict]:
+        conn = self._connect()
+        if status is None:
+            rows = conn.execute("SELECT job_id, data FROM jobs").fetchall()
+        else:
+            rows = conn.execute("SELECT job_id, data FROM jobs WHERE status = ?", (status,)).fetchall()
+        return [dict(json.loads(data), job_id=job_id) for job_id, data in rows]
+
+    def gc(self) -> int:
+        self._last_gc = time.time()
+        cutoff = self._last_gc - self.ttl
+        cursor = self._connect().execute(
+            f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) "
+            "AND updated_at < ?",
+            (*FINISHED_STATUSES, cutoff)
+        )
+        return cursor.rowcount
+
+    def fail_orphaned(self) -> int:
+        """Mark unfinished jobs whose owning process on this host has died as failed"""
+        host = socket.gethostname()
+        orphaned = 0
+        for status in ("pending", "processing"):
+            for job in self.list(status):
+                owner_host, _, pid = job.get("owner", "").rpartition(":")
+                if owner_host != host or not pid.isdigit() or _pid_alive(int(pid)):
+                    continue
+                self.update(job["job_id"], status="failed", error="Worker exited before the job finished",
+                            progress="Failed: worker exited")
+                orphaned += 1
+        return orphaned
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
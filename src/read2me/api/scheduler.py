@@ -0,0 +1,149 @@
+"""
+Bounded job scheduler for the Bookshelf API
+Fixed worker pool, fair queueing across users (short jobs first) and back-pressure when full
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised by JobScheduler.submit when the queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def default_workers() -> int:
+    """One worker per GPU, each with its own model; on CPU a single worker already uses every core through torch"""
+    if "READ2ME_API_WORKERS" in os.environ:
+        return max(1, int(os.environ["READ2ME_API_WORKERS"]))
+    if torch.cuda.is_available():
+        return torch.cuda.device_count()
+    return 1
+
+
+def worker_devices(workers: int) -> List[Optional[str]]:
+    """Device for each worker's generator: GPUs round-robin, or None (the default device)"""
+    if torch.cuda.is_available() and torch.cuda.device_count() > 1:
+        return [f"cuda:{i % torch.cuda.device_count()}" for i in range(workers)]
+    return [None] * workers
+
+
+class JobScheduler:
+    """Runs jobs on a fixed pool of threads in weighted-fair-queueing order
+
+    Each job has a cost (characters to synthesize). Jobs up to short_job_chars
+    (clips) always run ahead of longer ones (books). Within each class a job's
+    finish tag is max(virtual time, the user's previous finish tag) + cost and
+    the smallest tag runs next, so a user with many queued jobs cannot starve
+    everyone else.
+    """
+
+    def __init__(self, handler: Callable[..., None], workers: Optional[int] = None,
+                 max_queue: int = 64, short_job_chars: int = 2000):
+        self.handler = handler
+        self.workers = workers or default_workers()
+        self.max_queue = max_queue
+        self.short_job_chars = short_job_chars
+
+        self._queue = []  # heap of (priority, finish_tag, seq, start_tag, cost, args)
+        self._seq = itertools.count()
+        self._user_finish = {}  # user -> finish tag of their last queued job
+        self._virtual_time = 0.0
+        self._queued_cost = 0
+        self._running = 0
+        self._throughput = None  # chars/sec per worker, exponential moving average
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._local = threading.local()
+
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(i,), name=f"read2me-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, user: str, cost: int, *args):
+        """Queue handler(*args); raises QueueFullError when at capacity"""
+        cost = max(1, cost)
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(self.retry_after())
+
+            start = max(self._virtual_time, self._user_finish.get(user, 0.0))
+            finish = start + cost
+            self._user_finish[user] = finish
+            priority = 0 if cost <= self.short_job_chars else 1
+            heapq.heappush(self._queue, (priority, finish, next(self._seq), start, cost, args))
+            self._queued_cost += cost
+            self._cond.notify()
+
+    def retry_after(self) -> int:
+        """Seconds until roughly one queue slot frees up, from observed throughput"""
+        if not self._throughput:
+            return 30
+        per_job = self._queued_cost / max(1, len(self._queue))
+        seconds = per_job / (self._throughput * self.workers)
+        return int(min(3600, max(1, math.ceil(seconds))))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": len(self._queue),
+                "queued_chars": self._queued_cost,
+                "max_queue": self.max_queue,
+            }
+
+    def current_worker(self) -> Optional[int]:
+        """Index of the worker running the calling handler, or None outside the pool"""
+        return getattr(self._local, "index", None)
+
+    def shutdown(self, wait: bool = True):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _worker(self, index: int):
+        self._local.index = index
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _priority, _finish, _seq, start, cost, args = heapq.heappop(self._queue)
+                self._virtual_time = max(self._virtual_time, start)
+                self._queued_cost -= cost
+                self._running += 1
+
+            started = time.monotonic()
+            try:
+                self.handler(*args)
+            except Exception:
+                # Keep the worker alive; the handler is responsible for recording job failure
+                logger.exception("Scheduled job raised")
+            finally:
+                elapsed = max(time.monotonic() - started, 1e-3)
+                with self._cond:
+                    self._running -= 1
+                    rate = cost / elapsed
+                    self._throughput = rate if self._throughput is None else (
+                        0.8 * self._throughput + 0.2 * rate
+                    )
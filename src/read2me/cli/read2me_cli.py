@@ -4,181 +4,100 @@ Read2Me CLI - Simple command-line interface for audiobook generation
 """
 
 import argparse
-import os
-import sys
-import json
 import uuid
 from pathlib import Path
-import torch
-from TTS.api import TTS
+from ..lib.encoding import CHAPTER_FORMATS
+from ..lib.read2me_lib import AudiobookGenerator
 
 class Read2MeCLI:
+    """Command-line front end; synthesis, checkpointing and encoding are AudiobookGenerator's"""
+    
     def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = "tts_models/multilingual/multi-dataset/xtts_v2"
-        self.tts = None
         self.output_dir = Path("output")
-        self.output_dir.mkdir(exist_ok=True)
-        
-    def _init_tts(self):
-        """Initialize TTS model (lazy loading)"""
-        if self.tts is None:
-            print(f"Loading TTS model on {self.device}...")
-            self.tts = TTS(self.model).to(self.device)
+        self.generator = AudiobookGenerator(output_dir=str(self.output_dir))
     
     def list_voices(self):
         """List available built-in voices"""
-        voice_samples_dir = Path("voice_samples")
-        if not voice_samples_dir.exists():
+        if not self.generator.voice_samples_dir.exists():
             print("No voice samples directory found")
             return []
         
-        voices = []
-        for voice_file in voice_samples_dir.glob("*.wav"):
-            voices.append(voice_file.stem)
-        
+        voices = self.generator.get_available_voices()
         print("Available voices:")
-        for voice in sorted(voices):
+        for voice in voices:
             print(f"  - {voice}")
         return voices
     
-    def generate_tts(self, text, voice=None, voice_file=None, output_file=None, language="en"):
+    def generate_tts(self, text, voice=None, voice_file=None, output_file=None, language="en",
+                     output_format="wav"):
         """Generate TTS audio from text"""
-        self._init_tts()
-        
         if not output_file:
             task_id = str(uuid.uuid4())[:8]
             output_file = self.output_dir / f"audiobook_{task_id}.wav"
+        
+        if voice_file:
+            print(f"Cloning voice from: {voice_file}")
         else:
-            output_file = Path(output_file)
+            print(f"Using {'built-in' if voice else 'default'} voice: {voice or 'Ana Florence'}")
         
         try:
-            if voice_file:
-                # Voice cloning
-                print(f"Cloning voice from: {voice_file}")
-                self.tts.tts_to_file(
-                    text=text,
-                    speaker_wav=voice_file,
-                    file_path=str(output_file),
-                    language=language
-                )
-            elif voice:
-                # Built-in voice
-                print(f"Using built-in voice: {voice}")
-                self.tts.tts_to_file(
-                    text=text,
-                    file_path=str(output_file),
-                    speaker=voice,
-                    language=language,
-                    split_sentences=True
-                )
-            else:
-                # Default voice
-                print("Using default voice: Ana Florence")
-                self.tts.tts_to_file(
-                    text=text,
-                    file_path=str(output_file),
-                    speaker="Ana Florence",
-                    language=language,
-                    split_sentences=True
-                )
-            
-            print(f"Audio generated successfully: {output_file}")
-            return str(output_file)
-            
+            # An absolute path is used as is rather than under the generator's output directory
+            output_file = self.generator.generate_audio(
+                text=text,
+                voice=voice,
+                voice_file=voice_file,
+                language=language,
+                output_filename=str(Path(output_file).resolve()),
+                output_format=output_format
+            )
         except Exception as e:
             print(f"Error generating TTS: {e}")
             return None
+        
+        print(f"Audio generated successfully: {output_file}")
+        return output_file
     
-    def process_book(self, input_file, voice=None, voice_file=None, output_dir=None, language="en"):
+    def process_book(self, input_file, voice=None, voice_file=None, output_dir=None, language="en",
+                     resume=False, output_format="wav", m4b=False, workers=1):
         """Process a book file into audiobook"""
-        input_path = Path(input_file)
-        if not input_path.exists():
+        if not Path(input_file).exists():
             print(f"Input file not found: {input_file}")
             return None
         
-        # Read input text
         try:
-            with open(input_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        except Exception as e:
-            print(f"Error reading input file: {e}")
-            return None
-        
-        if not text.strip():
-            print("Input file is empty")
-            return None
-        
-        # Set output directory
-        if output_dir:
-            book_output_dir = Path(output_dir)
-        else:
-            book_output_dir = self.output_dir / input_path.stem
-        
-        book_output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Split into chapters if text is very long
-        max_chunk_size = 10000  # characters
-        if len(text) > max_chunk_size:
-            print(f"Large book detected ({len(text)} chars). Splitting into chapters...")
-            chapters = self._split_into_chapters(text, max_chunk_size)
-        else:
-            chapters = [text]
-        
-        # Generate audio for each chapter
-        audio_files = []
-        for i, chapter_text in enumerate(chapters, 1):
-            chapter_file = book_output_dir / f"chapter_{i:02d}.wav"
-            print(f"Processing chapter {i}/{len(chapters)}...")
-            
-            result = self.generate_tts(
-                text=chapter_text,
+            metadata = self.generator.create_audiobook_from_file(
+                file_path=input_file,
                 voice=voice,
                 voice_file=voice_file,
-                output_file=chapter_file,
-                language=language
+                language=language,
+                progress_callback=print,
+                workers=workers,
+                resume=resume,
+                output_format=output_format,
+                m4b=m4b,
+                pipeline=True,
+                book_dir=output_dir
             )
-            
-            if result:
-                audio_files.append(result)
-            else:
-                print(f"Failed to generate chapter {i}")
-        
-        # Create metadata file
-        metadata = {
-            "book_title": input_path.stem,
-            "total_chapters": len(chapters),
-            "voice_used": voice or "voice_clone" if voice_file else "Ana Florence",
-            "language": language,
-            "audio_files": audio_files
-        }
-        
-        metadata_file = book_output_dir / "metadata.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
-        
-        print(f"Audiobook generated in: {book_output_dir}")
-        print(f"Total chapters: {len(audio_files)}")
-        return str(book_output_dir)
-    
-    def _split_into_chapters(self, text, max_size):
-        """Split text into manageable chunks"""
-        # Simple splitting by paragraphs, respecting max size
-        paragraphs = text.split('\n\n')
-        chapters = []
-        current_chapter = ""
+        except Exception as e:
+            print(f"Error generating audiobook: {e}")
+            return None
         
-        for paragraph in paragraphs:
-            if len(current_chapter) + len(paragraph) > max_size and current_chapter:
-                chapters.append(current_chapter.strip())
-                current_chapter = paragraph
-            else:
-                current_chapter += "\n\n" + paragraph if current_chapter else paragraph
+        print(f"Audiobook generated in: {metadata['output_directory']}")
+        print(f"Total chapters: {metadata['total_chapters']}")
+        return metadata["output_directory"]
+    
+    def finetune_voice(self, voice_dir, **options):
+        """Fine-tune Tacotron2 on a data/audio/<speaker> directory from data_gathering"""
+        if not Path(voice_dir).is_dir():
+            print(f"Voice directory not found: {voice_dir}")
+            return None
         
-        if current_chapter.strip():
-            chapters.append(current_chapter.strip())
+        # Imported here: the training stack (Tacotron2, torch.distributed) is only needed for this command
+        from ..lib.finetune import finetune
         
-        return chapters
+        run_dir = finetune(voice_dir, **options)
+        print(f"Fine-tuned model in: {run_dir}")
+        return run_dir
 
 def main():
     parser = argparse.ArgumentParser(description="Read2Me CLI - Generate audiobooks from text")
@@ -195,14 +114,53 @@ def main():
     tts_parser.add_argument('--voice-file', help='Path to voice sample for cloning')
     tts_parser.add_argument('--output', help='Output file path')
     tts_parser.add_argument('--language', default='en', help='Language code (default: en)')
+    tts_parser.add_argument('--format', default='wav', choices=CHAPTER_FORMATS,
+                            help='Output format (default: wav; opus/mp3 need ffmpeg)')
     
     # Process book command
     book_parser = subparsers.add_parser('book', help='Process book file into audiobook')
-    book_parser.add_argument('input_file', help='Input text file (txt, epub, etc.)')
+    book_parser.add_argument('input_file', help='Input book file (txt or epub)')
     book_parser.add_argument('--voice', help='Built-in voice name')
     book_parser.add_argument('--voice-file', help='Path to voice sample for cloning')
     book_parser.add_argument('--output-dir', help='Output directory for audiobook')
     book_parser.add_argument('--language', default='en', help='Language code (default: en)')
+    book_parser.add_argument('--resume', action='store_true',
+                             help='Skip chapters completed by a previous run of the same book')
+    book_parser.add_argument('--format', default='wav', choices=CHAPTER_FORMATS,
+                             help='Chapter file format (default: wav; opus/mp3 need ffmpeg)')
+    book_parser.add_argument('--m4b', action='store_true',
+                             help='Also assemble a single chaptered .m4b audiobook (needs ffmpeg)')
+    book_parser.add_argument('--workers', type=int, default=1,
+                             help='Chapters synthesized in parallel, one model per process (default: 1)')
+    
+    # Fine-tune a voice
+    finetune_parser = subparsers.add_parser('finetune', help='Fine-tune Tacotron2 on a gathered voice dataset')
+    finetune_parser.add_argument('voice_dir', help='Voice directory (data/audio/<speaker>) with wavs/ and metadata')
+    finetune_parser.add_argument('--output-dir', help='Run directory (default: run-<speaker>)')
+    finetune_parser.add_argument('--features', help='Feature store directory (default: <voice_dir>/features)')
+    finetune_parser.add_argument('--epochs', type=int, default=10, help='Training epochs (default: 10)')
+    finetune_parser.add_argument('--batch-size', type=int, default=32,
+                                 help='Clips per batch per process (default: 32)')
+    finetune_parser.add_argument('--grad-accum', type=int, default=1,
+                                 help='Batches accumulated per optimizer step (default: 1)')
+    finetune_parser.add_argument('--lr', type=float, help='Learning rate (default: Tacotron2 config)')
+    finetune_parser.add_argument('--restore-path', help='Pretrained model_file.pth to start from')
+    finetune_parser.add_argument('--resume', action='store_true',
+                                 help="Continue from the run directory's checkpoint.pth")
+    finetune_parser.add_argument('--checkpoint-every', type=int, default=1000,
+                                 help='Optimizer steps between checkpoints (default: 1000)')
+    finetune_parser.add_argument('--procs', type=int, default=1,
+                                 help='Training processes on this node (default: 1)')
+    finetune_parser.add_argument('--nnodes', type=int, default=1, help='Number of nodes (default: 1)')
+    finetune_parser.add_argument('--node-rank', type=int, default=0, help='Rank of this node (default: 0)')
+    finetune_parser.add_argument('--master-addr', default='127.0.0.1',
+                                 help='Address of node 0 (default: 127.0.0.1)')
+    finetune_parser.add_argument('--master-port', type=int, default=29500,
+                                 help='Port on node 0 (default: 29500)')
+    finetune_parser.add_argument('--threads', type=int,
+                                 help='Torch threads per process (default: CPU cores / procs)')
+    finetune_parser.add_argument('--loader-workers', type=int, default=2,
+                                 help='DataLoader workers per process (default: 2)')
     
     args = parser.parse_args()
     
@@ -221,7 +179,8 @@ def main():
             voice=args.voice,
             voice_file=args.voice_file,
             output_file=args.output,
-            language=args.language
+            language=args.language,
+            output_format=args.format
         )
     
     elif args.command == 'book':
@@ -230,7 +189,32 @@ def main():
             voice=args.voice,
             voice_file=args.voice_file,
             output_dir=args.output_dir,
-            language=args.language
+            language=args.language,
+            resume=args.resume,
+            output_format=args.format,
+            m4b=args.m4b,
+            workers=args.workers
+        )
+    
+    elif args.command == 'finetune':
+        cli.finetune_voice(
+            args.voice_dir,
+            output_dir=args.output_dir,
+            features=args.features,
+            epochs=args.epochs,
+            batch_size=args.batch_size,
+            grad_accum=args.grad_accum,
+            lr=args.lr,
+            restore_path=args.restore_path,
+            resume=args.resume,
+            checkpoint_every=args.checkpoint_every,
+            procs=args.procs,
+            nnodes=args.nnodes,
+            node_rank=args.node_rank,
+            master_addr=args.master_addr,
+            master_port=args.master_port,
+            threads=args.threads,
+            loader_workers=args.loader_workers
         )
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""
+Background audio writer
+Takes synthesized float32 buffers off a bounded queue and normalizes, writes and renames them on a separate thread
+"""
+
+import math
+import os
+import queue
+import threading
+import time
+import wave
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .metrics import get_metrics
+
+
+def write_wav(path: str, wav: np.ndarray, sample_rate: int) -> Dict:
+    """Peak-normalize to 16-bit PCM (as Coqui's save_wav does) and write atomically
+
+    Returns the file's audio info (see audio_info), computed from the buffer
+    that was written so nobody has to open the file again to learn it.
+    """
+    start = time.perf_counter()
+    wav = np.asarray(wav, dtype=np.float32)
+    peak = max(0.01, float(np.max(np.abs(wav)))) if len(wav) else 1.0
+    pcm = (wav * (32767 / peak)).astype("<i2")
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with wave.open(str(tmp_path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    os.replace(tmp_path, path)
+
+    size = path.stat().st_size
+    get_metrics().observe_stage("write", time.perf_counter() - start)
+    return audio_info(str(path), pcm, sample_rate, size, data_offset=size - pcm.nbytes)
+
+
+def audio_info(path: str, pcm: np.ndarray, sample_rate: int, size: int,
+               data_offset: Optional[int] = None) -> Dict:
+    """Duration, sample count, loudness and layout of a 16-bit mono PCM buffer stored at path"""
+    samples = len(pcm)
+    scaled = pcm.astype(np.float64) / 32768.0
+    peak = float(np.max(np.abs(scaled))) if samples else 0.0
+    rms = float(np.sqrt(np.mean(scaled * scaled))) if samples else 0.0
+    return {
+        "path": path,
+        "sample_rate": sample_rate,
+        "samples": samples,
+        "duration": samples / float(sample_rate),
+        "peak_dbfs": _dbfs(peak),
+        "rms_dbfs": _dbfs(rms),
+        "bytes": size,
+        "data_offset": data_offset,  # Byte offset of the PCM samples (WAV only)
+    }
+
+
+def _dbfs(level: float) -> Optional[float]:
+    return round(20 * math.log10(level), 2) + 0.0 if level > 0 else None  # + 0.0 folds -0.0
+
+
+class AudioWriter:
+    """Writer thread fed by a bounded queue, so synthesis never waits on disk
+
+    submit() blocks once max_pending buffers are waiting, which caps memory at
+    a couple of chapters of audio if the disk falls behind.
+    """
+
+    def __init__(self, max_pending: int = 2):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {}  # future -> caller's key
+        self._thread = threading.Thread(target=self._run, name="read2me-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, key: Any, wav: np.ndarray, sample_rate: int, path: str):
+        future = Future()
+        self._pending[future] = key
+        get_metrics().queue_depth.set(len(self._pending), queue="writer")
+        self._queue.put((future, wav, sample_rate, path))
+
+    def completed(self, wait_all: bool = False) -> Iterator[Tuple[Any, Future]]:
+        """(key, future) for finished writes; with wait_all, block until none are pending"""
+        while self._pending:
+            done, _ = wait(self._pending, timeout=None if wait_all else 0,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                return
+            for future in done:
+                key = self._pending.pop(future)
+                get_metrics().queue_depth.set(len(self._pending), queue="writer")
+                yield key, future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, wav, sample_rate, path = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(write_wav(path, wav, sample_rate))
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,248 @@
+"""
+Batched sentence-level synthesis for XTTS
+Segments text into sentences, buckets them by token length and runs padded batches through the model
+"""
+
+import threading
+import weakref
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .segment_cache import SegmentCache, segment_key
+from .speaker_cache import compute_conditioning
+from .splitter import MAX_SENTENCE_CHARS, split_sentences
+
+# XTTS keeps per-call state on the GPT module (prefix embeddings), so calls into one model are serialized
+_model_locks = weakref.WeakKeyDictionary()
+_model_locks_guard = threading.Lock()
+
+
+def model_lock(model) -> threading.Lock:
+    """Lock serializing inference on one model instance"""
+    with _model_locks_guard:
+        lock = _model_locks.get(model)
+        if lock is None:
+            lock = _model_locks[model] = threading.Lock()
+        return lock
+
+
+def xtts_language(language: str) -> str:
+    """Language code as XTTS expects it, without the country code (en-US -> en)"""
+    return language.split("-")[0]
+
+
+def join_sentences(wavs: List[np.ndarray], sample_rate: int, silence: float = 0.2) -> np.ndarray:
+    """Concatenate per-sentence audio with a fixed gap between sentences"""
+    if not wavs:
+        return np.zeros(0, dtype=np.float32)
+    gap = np.zeros(int(sample_rate * silence), dtype=np.float32)
+    parts = []
+    for i, wav in enumerate(wavs):
+        if i and len(gap):
+            parts.append(gap)
+        parts.append(wav)
+    return np.concatenate(parts).astype(np.float32, copy=False)
+
+
+class BatchedSynthesizer:
+    """Runs sentences through XTTS in padded batches of similar token length"""
+
+    def __init__(self, tts, batch_size: int = 8, sentence_silence: float = 0.2,
+                 max_padding: float = 0.25, segment_cache: Optional[SegmentCache] = None,
+                 model_version: str = ""):
+        self.tts = tts
+        self.batch_size = batch_size
+        self.sentence_silence = sentence_silence
+        self.max_padding = max_padding
+        self.segment_cache = segment_cache
+        self.model_version = model_version
+
+    @property
+    def sample_rate(self) -> int:
+        return self.tts.synthesizer.output_sample_rate
+
+    @property
+    def xtts(self):
+        """The underlying Xtts model, or None for models without the batched path"""
+        model = getattr(getattr(self.tts, "synthesizer", None), "tts_model", None)
+        if hasattr(model, "gpt") and hasattr(model, "hifigan_decoder"):
+            return model
+        return None
+
+    def sentence_limit(self, language: str) -> int:
+        """Longest sentence XTTS handles for the language without truncating audio"""
+        xtts = self.xtts
+        if xtts is None:
+            return MAX_SENTENCE_CHARS
+        limits = getattr(xtts.tokenizer, "char_limits", {})
+        return limits.get(xtts_language(language), MAX_SENTENCE_CHARS)
+
+    def conditioning(self, speaker: Optional[str] = None,
+                     speaker_wav: Optional[str] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """GPT conditioning latent and speaker embedding for a built-in or cloned voice"""
+        xtts = self.xtts
+        if speaker_wav:
+            return compute_conditioning(xtts, speaker_wav)
+        latents = xtts.speaker_manager.speakers[speaker]
+        return latents["gpt_cond_latent"], latents["speaker_embedding"]
+
+    def synthesize(self, text: str, language: str = "en", speaker: Optional[str] = None,
+                   speaker_wav: Optional[str] = None,
+                   conditioning: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+                   voice_id: Optional[str] = None) -> np.ndarray:
+        """Synthesize text and return one float32 waveform"""
+        sentences = split_sentences(text, self.sentence_limit(language))
+        wavs = self.synthesize_sentences(sentences, language, speaker, speaker_wav,
+                                         conditioning, voice_id)
+        return join_sentences(wavs, self.sample_rate, self.sentence_silence)
+
+    def synthesize_sentences(self, sentences: List[str], language: str = "en",
+                             speaker: Optional[str] = None,
+                             speaker_wav: Optional[str] = None,
+                             conditioning: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+                             voice_id: Optional[str] = None) -> List[np.ndarray]:
+        """Synthesize each sentence; results are returned in input order
+
+        conditioning, when given, is a precomputed (gpt_cond_latent, speaker_embedding)
+        pair and takes precedence over speaker/speaker_wav. voice_id identifies the voice
+        in the segment cache; without it the cache is bypassed.
+        """
+        if not sentences:
+            return []
+
+        keys = None
+        wavs = [None] * len(sentences)
+        if self.segment_cache is not None and voice_id:
+            params = self.sampling_params()
+            keys = [segment_key(sentence, voice_id, language, self.model_version, params)
+                    for sentence in sentences]
+            wavs = [self.segment_cache.get(key) for key in keys]
+
+        missing = [i for i, wav in enumerate(wavs) if wav is None]
+        if missing:
+            synthesized = self._synthesize_uncached(
+                [sentences[i] for i in missing], language, speaker, speaker_wav, conditioning
+            )
+            for i, wav in zip(missing, synthesized):
+                wavs[i] = wav
+                if keys is not None:
+                    self.segment_cache.put(keys[i], wav, self.sample_rate)
+        return wavs
+
+    def sampling_params(self) -> dict:
+        """Model settings that change the synthesized audio, for cache keys"""
+        xtts = self.xtts
+        if xtts is None:
+            return {}
+        config = xtts.config
+        return {
+            "temperature": config.temperature,
+            "top_p": config.top_p,
+            "top_k": config.top_k,
+            "length_penalty": config.length_penalty,
+            "repetition_penalty": config.repetition_penalty,
+        }
+
+    def _synthesize_uncached(self, sentences: List[str], language: str,
+                             speaker: Optional[str], speaker_wav: Optional[str],
+                             conditioning: Optional[Tuple[torch.Tensor, torch.Tensor]]
+                             ) -> List[np.ndarray]:
+        xtts = self.xtts
+        if xtts is None:
+            if conditioning is not None:
+                raise ValueError("Precomputed speaker conditioning requires an XTTS model")
+            wavs = []
+            for sentence in sentences:
+                with model_lock(self.tts):
+                    wav = self.tts.tts(text=sentence, speaker=speaker, speaker_wav=speaker_wav,
+                                       language=language)
+                wavs.append(np.asarray(wav, dtype=np.float32))
+            return wavs
+
+        gpt_cond_latent, speaker_embedding = conditioning or self.conditioning(speaker, speaker_wav)
+        lang = xtts_language(language)
+        tokens = [xtts.tokenizer.encode(sentence.strip(), lang=lang) for sentence in sentences]
+
+        wavs = [None] * len(sentences)
+        for bucket in self._buckets([len(t) for t in tokens]):
+            with model_lock(xtts):
+                batch_wavs = self._infer_batch(xtts, [tokens[i] for i in bucket],
+                                               gpt_cond_latent, speaker_embedding)
+            for i, wav in zip(bucket, batch_wavs):
+                wavs[i] = wav
+        return wavs
+
+    def _buckets(self, lengths: List[int]) -> List[List[int]]:
+        """Group sentence indices by token length, bounding batch size and padding"""
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        buckets = []
+        current = []
+        for i in order:
+            if current and (
+                len(current) >= self.batch_size
+                or lengths[i] > lengths[current[0]] * (1 + self.max_padding)
+            ):
+                buckets.append(current)
+                current = []
+            current.append(i)
+        if current:
+            buckets.append(current)
+        return buckets
+
+    @torch.inference_mode()
+    def _infer_batch(self, xtts, tokens: List[List[int]], gpt_cond_latent: torch.Tensor,
+                     speaker_embedding: torch.Tensor) -> List[np.ndarray]:
+        """One padded GPT pass for the batch, then per-sentence vocoding"""
+        gpt = xtts.gpt
+        config = xtts.config
+        device = gpt_cond_latent.device
+        batch = len(tokens)
+
+        # Pad with the stop token, which is what the GPT sees after text during training
+        text_lengths = torch.tensor([len(t) for t in tokens], device=device)
+        text_tokens = torch.full((batch, int(text_lengths.max())), gpt.stop_text_token,
+                                 dtype=torch.int32, device=device)
+        for row, t in enumerate(tokens):
+            text_tokens[row, :len(t)] = torch.tensor(t, dtype=torch.int32, device=device)
+
+        cond_latents = gpt_cond_latent.expand(batch, -1, -1)
+        gpt_codes = gpt.generate(
+            cond_latents=cond_latents,
+            text_inputs=text_tokens,
+            input_tokens=None,
+            do_sample=True,
+            top_p=config.top_p,
+            top_k=config.top_k,
+            temperature=config.temperature,
+            num_return_sequences=1,
+            num_beams=1,
+            length_penalty=config.length_penalty,
+            repetition_penalty=config.repetition_penalty,
+            output_attentions=False,
+        )
+
+        # Rows that finished early are padded with the stop token
+        code_lengths = []
+        for row in gpt_codes:
+            stops = (row == gpt.stop_audio_token).nonzero()
+            code_lengths.append(int(stops[0]) if len(stops) else row.shape[-1])
+        code_lengths = torch.tensor(code_lengths, device=device)
+
+        gpt_latents = gpt(
+            text_tokens,
+            text_lengths,
+            gpt_codes,
+            code_lengths * gpt.code_stride_len,
+            cond_latents=cond_latents,
+            return_attentions=False,
+            return_latent=True,
+        )
+
+        wavs = []
+        for row in range(batch):
+            latents = gpt_latents[row:row + 1, :int(code_lengths[row])]
+            wav = xtts.hifigan_decoder(latents, g=speaker_embedding)
+            wavs.append(wav.squeeze().float().cpu().numpy())
+        return wavs
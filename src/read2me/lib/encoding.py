@@ -0,0 +1,180 @@
+"""
+Compressed audio encoding for finished chapters
+Transcodes WAV output to Opus/MP3 on a worker pool and assembles chaptered M4B audiobooks
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+
+from .metrics import get_metrics
+
+# Format -> file extension, ffmpeg codec arguments and muxer, default bitrate and MIME type
+OUTPUT_FORMATS = {
+    "wav": {"extension": ".wav", "codec": None, "muxer": None, "bitrate": None,
+            "mimetype": "audio/wav"},
+    "opus": {"extension": ".opus", "codec": ["-c:a", "libopus", "-application", "voip"],
+             "muxer": "ogg", "bitrate": "32k", "mimetype": "audio/ogg"},
+    "mp3": {"extension": ".mp3", "codec": ["-c:a", "libmp3lame"],
+            "muxer": "mp3", "bitrate": "64k", "mimetype": "audio/mpeg"},
+    "m4b": {"extension": ".m4b", "codec": ["-c:a", "aac"],
+            "muxer": "mp4", "bitrate": "64k", "mimetype": "audio/mp4"},
+}
+
+# Formats a single chapter can be written in (M4B is only produced for a whole book)
+CHAPTER_FORMATS = ("wav", "opus", "mp3")
+
+
+def _require_ffmpeg(tool: str = "ffmpeg"):
+    if shutil.which(tool) is None:
+        raise RuntimeError(f"{tool} is required for compressed output")
+
+
+def mimetype_for(path: str) -> Optional[str]:
+    """MIME type of an output file from its extension"""
+    suffix = Path(path).suffix.lower()
+    for spec in OUTPUT_FORMATS.values():
+        if spec["extension"] == suffix:
+            return spec["mimetype"]
+    return None
+
+
+def encode_file(wav_path: str, audio_format: str, bitrate: Optional[str] = None,
+                keep_source: bool = False, output_path: Optional[str] = None) -> str:
+    """Transcode a WAV file (by default next to itself, with the format's extension); returns the encoded path"""
+    if audio_format not in CHAPTER_FORMATS:
+        raise ValueError(f"Unsupported output format: {audio_format}")
+    spec = OUTPUT_FORMATS[audio_format]
+    if spec["codec"] is None:
+        return str(wav_path)
+    _require_ffmpeg()
+
+    output_path = Path(output_path or Path(wav_path).with_suffix(spec["extension"]))
+    if output_path.resolve() == Path(wav_path).resolve():
+        # Replacing the source with the encoding and then removing the source would lose both
+        raise ValueError(f"Cannot encode {wav_path} onto itself")
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    start = time.perf_counter()
+    subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", str(wav_path),
+         *spec["codec"], "-b:a", bitrate or spec["bitrate"], "-f", spec["muxer"], str(tmp_path)],
+        check=True, capture_output=True
+    )
+    os.replace(tmp_path, output_path)
+    get_metrics().observe_stage("encode", time.perf_counter() - start)
+    if not keep_source:
+        os.remove(wav_path)
+    return str(output_path)
+
+
+def audio_duration(path: str) -> float:
+    """Duration in seconds (WAV header, or ffprobe for compressed files)"""
+    if Path(path).suffix.lower() == ".wav":
+        with wave.open(str(path), "rb") as f:
+            return f.getnframes() / float(f.getframerate())
+    _require_ffmpeg("ffprobe")
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)],
+        check=True, capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def _ffmetadata_escape(value: str) -> str:
+    for char in ("\\", "=", ";", "#", "\n"):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def assemble_m4b(chapter_paths: List[str], output_path: str, titles: Optional[List[Optional[str]]] = None,
+                 durations: Optional[List[Optional[float]]] = None, book_title: Optional[str] = None,
+                 bitrate: Optional[str] = None) -> str:
+    """Concatenate chapter files into one AAC .m4b with a chapter marker per input file
+
+    Chapter durations are probed from the files unless already known.
+    """
+    _require_ffmpeg()
+    titles = titles or [None] * len(chapter_paths)
+    durations = durations or [None] * len(chapter_paths)
+    output_path = Path(output_path)
+
+    with tempfile.TemporaryDirectory(prefix="read2me-m4b-") as tmp_dir:
+        concat_file = Path(tmp_dir) / "chapters.txt"
+        metadata_file = Path(tmp_dir) / "metadata.txt"
+
+        with open(concat_file, "w", encoding="utf-8") as f:
+            for path in chapter_paths:
+                escaped = str(Path(path).resolve()).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        lines = [";FFMETADATA1"]
+        if book_title:
+            lines.append(f"title={_ffmetadata_escape(book_title)}")
+        start_ms = 0
+        for i, (path, title, duration) in enumerate(zip(chapter_paths, titles, durations), 1):
+            if duration is None:
+                duration = audio_duration(path)
+            end_ms = start_ms + int(round(duration * 1000))
+            lines += ["[CHAPTER]", "TIMEBASE=1/1000", f"START={start_ms}", f"END={end_ms}",
+                      f"title={_ffmetadata_escape(title or f'Chapter {i}')}"]
+            start_ms = end_ms
+        with open(metadata_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        tmp_output = output_path.with_name(output_path.name + ".tmp")
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-y",
+             "-f", "concat", "-safe", "0", "-i", str(concat_file),
+             "-i", str(metadata_file), "-map", "0:a", "-map_metadata", "1", "-map_chapters", "1",
+             *OUTPUT_FORMATS["m4b"]["codec"], "-b:a", bitrate or OUTPUT_FORMATS["m4b"]["bitrate"],
+             "-movflags", "+faststart", "-f", OUTPUT_FORMATS["m4b"]["muxer"], str(tmp_output)],
+            check=True, capture_output=True
+        )
+    os.replace(tmp_output, output_path)
+    return str(output_path)
+
+
+class ChapterEncoder:
+    """Transcodes finished chapters on a thread pool while the next chapter is synthesizing
+
+    Each job runs its own ffmpeg process, so the threads only wait on them and
+    encoding never competes with synthesis for the interpreter.
+    """
+
+    def __init__(self, audio_format: str, bitrate: Optional[str] = None, workers: int = 2,
+                 keep_source: bool = False):
+        if audio_format not in CHAPTER_FORMATS:
+            raise ValueError(f"Unsupported output format: {audio_format}")
+        _require_ffmpeg()
+        self.audio_format = audio_format
+        self.bitrate = bitrate
+        self.keep_source = keep_source
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="read2me-encode")
+        self._pending = {}  # future -> caller's key
+
+    def submit(self, key: Any, wav_path: str):
+        future = self._pool.submit(encode_file, wav_path, self.audio_format, self.bitrate,
+                                   self.keep_source)
+        self._pending[future] = key
+        get_metrics().queue_depth.set(len(self._pending), queue="encoder")
+
+    def completed(self, wait_all: bool = False) -> Iterator[Tuple[Any, Future]]:
+        """(key, future) for finished encodes; with wait_all, block until none are pending"""
+        while self._pending:
+            done, _ = wait(self._pending, timeout=None if wait_all else 0,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                return
+            for future in done:
+                key = self._pending.pop(future)
+                get_metrics().queue_depth.set(len(self._pending), queue="encoder")
+                yield key, future
+
+    def close(self):
+        self._pool.shutdown(wait=True)
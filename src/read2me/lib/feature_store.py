@@ -0,0 +1,277 @@
+"""
+Precomputed feature store for fine-tuning
+Mel spectrograms and token ids computed once, memory-mapped and indexed by length for bucketed batches
+"""
+
+import hashlib
+import json
+import os
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+from TTS.tts.utils.data import prepare_data, prepare_stop_target, prepare_tensor
+from TTS.tts.utils.text.tokenizer import TTSTokenizer
+from TTS.utils.audio import AudioProcessor
+
+# Bump when the store layout changes, so old stores are rebuilt
+STORE_VERSION = 1
+
+
+def load_metadata(dataset_path: str) -> List[Tuple[str, str, str]]:
+    """(name, text, wav path) for every clip in the dataset's LJSpeech metadata.txt (id|text|normalized text)"""
+    entries = []
+    with open(os.path.join(dataset_path, "metadata.txt"), "r", encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("|")
+            if len(cols) > 1:
+                name, text = cols[0], cols[2] if len(cols) > 2 else cols[1]
+                entries.append((name, text, os.path.join(dataset_path, "wavs", name + ".wav")))
+    return entries
+
+
+def fingerprint(dataset_path: str, config) -> str:
+    """Hash of everything the features depend on: the transcripts, the clips and the audio and text settings"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(os.path.join(dataset_path, "metadata.txt"), "rb") as f:
+        h.update(f.read())
+    # A re-recorded or re-trimmed clip keeps its name, so its size and mtime stand in for its contents
+    for name, _text, wav_path in load_metadata(dataset_path):
+        stat = os.stat(wav_path)
+        h.update(f"{name}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    settings = {
+        "version": STORE_VERSION,
+        "audio": config.audio.to_dict(),
+        "characters": config.characters.to_dict() if config.characters else None,
+        "use_phonemes": config.use_phonemes,
+        "phoneme_language": config.phoneme_language,
+        "text_cleaner": config.text_cleaner,
+        "add_blank": config.add_blank,
+        "enable_eos_bos_chars": config.enable_eos_bos_chars,
+    }
+    h.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+_ap = None  # per worker process
+_tokenizer = None
+
+
+def _init_worker(config_class, config_dict):
+    global _ap, _tokenizer
+    config = config_class()
+    config.from_dict(config_dict)
+    _ap = AudioProcessor.init_from_config(config, verbose=False)
+    _tokenizer, _ = TTSTokenizer.init_from_config(config)
+
+
+def _featurize(clip: Tuple[str, str, str]):
+    name, text, wav_path = clip
+    wav = np.asarray(_ap.load_wav(wav_path), dtype=np.float32)
+    mel = _ap.melspectrogram(wav).astype(np.float32).T  # frames x n_mels
+    token_ids = np.asarray(_tokenizer.text_to_ids(text), dtype=np.int32)
+    return name, text, wav_path, np.ascontiguousarray(mel), token_ids
+
+
+def build_store(store_path: str, dataset_path: str, config, workers: Optional[int] = None):
+    """Compute features for every clip of a dataset into store_path
+
+    Clips are processed shortest first (by file size), so the store lies
+    roughly in length order and a bucket of similar lengths is read from
+    one region of the file. index.json is written last; a store without it
+    is incomplete.
+    """
+    clips = [clip for clip in load_metadata(dataset_path) if os.path.exists(clip[2])]
+    clips.sort(key=lambda clip: os.path.getsize(clip[2]))
+    os.makedirs(store_path, exist_ok=True)
+
+    items = []
+    mel_start = token_start = 0
+    n_mels = config.audio.num_mels
+    mels_path, tokens_path = os.path.join(store_path, "mels.f32"), os.path.join(store_path, "tokens.i32")
+    with open(mels_path + ".tmp", "wb") as mels, open(tokens_path + ".tmp", "wb") as tokens, \
+            Pool(workers, initializer=_init_worker, initargs=(type(config), config.to_dict())) as pool:
+        for name, text, wav_path, mel, token_ids in pool.imap(_featurize, clips, chunksize=8):
+            if len(mel) == 0 or len(token_ids) == 0:
+                print(f" [!] Skipped empty clip: {wav_path}")
+                continue
+            mels.write(mel.tobytes())
+            tokens.write(token_ids.tobytes())
+            items.append({
+                "name": name, "text": text, "audio_file": wav_path,
+                "mel_start": mel_start, "frames": len(mel),
+                "token_start": token_start, "tokens": len(token_ids),
+            })
+            mel_start += len(mel)
+            token_start += len(token_ids)
+            if len(items) % 500 == 0:
+                print(f" > Computed features for {len(items)}/{len(clips)} clips")
+    os.replace(mels_path + ".tmp", mels_path)
+    os.replace(tokens_path + ".tmp", tokens_path)
+
+    index_path = os.path.join(store_path, "index.json")
+    with open(index_path + ".tmp", "w") as f:
+        json.dump({
+            "fingerprint": fingerprint(dataset_path, config),
+            "n_mels": n_mels,
+            "items": items,
+        }, f)
+    os.replace(index_path + ".tmp", index_path)
+    print(f" > Feature store: {len(items)} clips, {mel_start} frames in {store_path}")
+
+
+class FeatureStore:
+    """Memory-mapped mels and token ids, with per-clip lengths"""
+
+    def __init__(self, store_path: str):
+        with open(os.path.join(store_path, "index.json"), "r") as f:
+            index = json.load(f)
+        self.fingerprint = index["fingerprint"]
+        self.items = index["items"]
+        self.frames = np.array([item["frames"] for item in self.items], dtype=np.int64)
+        self.mels = np.memmap(os.path.join(store_path, "mels.f32"), dtype=np.float32,
+                              mode="r").reshape(-1, index["n_mels"])
+        self.tokens = np.memmap(os.path.join(store_path, "tokens.i32"), dtype=np.int32, mode="r")
+
+    @classmethod
+    def open(cls, store_path: str, dataset_path: str, config, workers: Optional[int] = None) -> "FeatureStore":
+        """Open the store, building it first if it is missing or out of date"""
+        expected = fingerprint(dataset_path, config)
+        if os.path.exists(os.path.join(store_path, "index.json")):
+            store = cls(store_path)
+            if store.fingerprint == expected:
+                return store
+            print(f" > Feature store {store_path} is out of date, rebuilding")
+        build_store(store_path, dataset_path, config, workers)
+        return cls(store_path)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def mel(self, i: int) -> np.ndarray:
+        item = self.items[i]
+        return np.array(self.mels[item["mel_start"]:item["mel_start"] + item["frames"]])
+
+    def token_ids(self, i: int) -> np.ndarray:
+        item = self.items[i]
+        return np.array(self.tokens[item["token_start"]:item["token_start"] + item["tokens"]])
+
+    def split(self, eval_split_size: float = 0.01,
+              eval_split_max_size: Optional[int] = None) -> Tuple[List[int], List[int]]:
+        """Train and eval clip indices, chosen as TTS's split_dataset does"""
+        if eval_split_size > 1:
+            eval_size = int(eval_split_size)
+        elif eval_split_max_size:
+            eval_size = min(eval_split_max_size, int(len(self) * eval_split_size))
+        else:
+            eval_size = int(len(self) * eval_split_size)
+        assert eval_size > 0, f" [!] Not enough clips for an eval split of {eval_split_size}"
+        order = np.random.RandomState(0).permutation(len(self)).tolist()
+        return order[eval_size:], order[:eval_size]
+
+
+class StoreDataset(Dataset):
+    """Clips from a FeatureStore, batched into what TTSDataset.collate_fn returns"""
+
+    def __init__(self, store: FeatureStore, indices: Sequence[int], config):
+        self.store = store
+        self.indices = list(indices)
+        self.config = config  # read at collate time, so gradual training's r changes apply
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, i: int) -> Dict:
+        idx = self.indices[i]
+        return {"item": self.store.items[idx], "mel": self.store.mel(idx), "token_ids": self.store.token_ids(idx)}
+
+    def collate_fn(self, batch: List[Dict]) -> Dict:
+        r = self.config.r if "r" in self.config else 1
+        # The encoder packs padded sequences, which needs them longest first
+        batch = sorted(batch, key=lambda b: len(b["token_ids"]), reverse=True)
+        items = [b["item"] for b in batch]
+
+        mel_lengths = [len(b["mel"]) for b in batch]
+        stop_targets = prepare_stop_target([np.array([0.0] * (n - 1) + [1.0]) for n in mel_lengths], r)
+        mel = prepare_tensor([b["mel"].T for b in batch], r).transpose(0, 2, 1)
+        token_ids = prepare_data([b["token_ids"] for b in batch]).astype(np.int32)
+
+        return {
+            "token_id": torch.LongTensor(token_ids),
+            "token_id_lengths": torch.LongTensor([len(b["token_ids"]) for b in batch]),
+            "speaker_names": [None] * len(batch),
+            "linear": None,
+            "mel": torch.FloatTensor(mel).contiguous(),
+            "mel_lengths": torch.LongTensor(mel_lengths),
+            "stop_targets": torch.FloatTensor(stop_targets),
+            "item_idxs": [item["audio_file"] for item in items],
+            "d_vectors": None,
+            "speaker_ids": None,
+            "attns": None,
+            "waveform": None,
+            "raw_text": [item["text"] for item in items],
+            "pitch": None,
+            "energy": None,
+            "language_ids": None,
+            "audio_unique_names": [item["name"] for item in items],
+        }
+
+
+class LengthBucketSampler(Sampler):
+    """Batches of clips with similar frame counts, in a new random order each epoch
+
+    Sorting by length keeps padding (and wasted compute) per batch small.
+    The batch size is read from the config on every pass, so gradual
+    training's schedule applies. With several replicas every rank draws the
+    same permutation and takes every num_replicas-th batch.
+    """
+
+    def __init__(self, lengths: Sequence[int], config, is_eval: bool = False, num_replicas: int = 1,
+                 rank: int = 0, seed: int = 0):
+        self.lengths = np.asarray(lengths)
+        self.config = config
+        self.is_eval = is_eval
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.epoch = 0
+
+    def _batch_size(self) -> int:
+        return self.config.eval_batch_size if self.is_eval else self.config.batch_size
+
+    def __len__(self) -> int:
+        return -(-len(self.lengths) // self._batch_size()) // self.num_replicas
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        if not self.is_eval:
+            self.epoch += 1
+        # Random tie-breaking so equal lengths are not always batched together
+        order = np.lexsort((rng.random(len(self.lengths)), self.lengths))
+        batch_size = self._batch_size()
+        batches = [order[i:i + batch_size].tolist() for i in range(0, len(order), batch_size)]
+        if not self.is_eval:
+            rng.shuffle(batches)
+        # Equal counts on every rank, so no rank waits on a batch the others skip
+        per_rank = len(batches) // self.num_replicas
+        return iter(batches[self.rank::self.num_replicas][:per_rank])
+
+
+def make_loader(store: FeatureStore, indices: Sequence[int], config, is_eval: bool,
+                num_replicas: int = 1, rank: Optional[int] = 0) -> DataLoader:
+    """DataLoader over store clips, length-bucketed; with several replicas, this rank's share"""
+    dataset = StoreDataset(store, indices, config)
+    sampler = LengthBucketSampler(
+        store.frames[dataset.indices], config, is_eval=is_eval,
+        num_replicas=max(1, num_replicas), rank=rank or 0,
+    )
+    return DataLoader(
+        dataset,
+        batch_sampler=sampler,
+        collate_fn=dataset.collate_fn,
+        num_workers=config.num_eval_loader_workers if is_eval else config.num_loader_workers,
+        pin_memory=False,
+    )
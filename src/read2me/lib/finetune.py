@@ -0,0 +1,363 @@
+"""
+Voice fine-tuning
+Tacotron2 fine-tuning on a data/audio/<speaker> directory, data-parallel over gloo across CPU processes and nodes
+"""
+
+import contextlib
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, Optional
+
+import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel
+
+from TTS.config.shared_configs import BaseAudioConfig
+from TTS.tts.configs.shared_configs import BaseDatasetConfig
+from TTS.tts.configs.tacotron2_config import Tacotron2Config
+from TTS.tts.models.tacotron2 import Tacotron2
+from TTS.tts.utils.text.tokenizer import TTSTokenizer
+from TTS.utils.audio import AudioProcessor
+
+from .feature_store import FeatureStore, make_loader
+
+# Files in a run directory; best_model.pth and config.json load with `tts --model_path/--config_path`
+CHECKPOINT_NAME = "checkpoint.pth"
+BEST_MODEL_NAME = "best_model.pth"
+CONFIG_NAME = "config.json"
+
+# (first step, reduction factor r); r frames are decoded per step, coarse first
+GRADUAL_R = ((0, 6), (10000, 4), (50000, 3), (100000, 2))
+
+
+def write_ljspeech_metadata(voice_dir: str) -> str:
+    """Write <voice_dir>/metadata.txt (LJSpeech: id|text|normalized text) from metadata.json
+
+    metadata.json is what data_gathering writes (clip -> transcript). Clips
+    without a WAV or with an empty transcript are left out. Kept as is when
+    newer than metadata.json; a voice with only metadata.txt is used as is.
+    Returns the path of metadata.txt.
+    """
+    json_path = os.path.join(voice_dir, "metadata.json")
+    txt_path = os.path.join(voice_dir, "metadata.txt")
+    if not os.path.exists(json_path):
+        if os.path.exists(txt_path):
+            return txt_path
+        raise FileNotFoundError(f"No metadata.json or metadata.txt in {voice_dir}")
+    if os.path.exists(txt_path) and os.path.getmtime(txt_path) >= os.path.getmtime(json_path):
+        return txt_path
+
+    with open(json_path, "r") as f:
+        transcripts = json.load(f)
+    lines = []
+    for clip, text in transcripts.items():
+        text = " ".join(text.replace("|", " ").split())
+        if text and os.path.exists(os.path.join(voice_dir, "wavs", clip + ".wav")):
+            lines.append(f"{clip}|{text}|{text}\n")
+
+    with open(txt_path + ".tmp", "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    os.replace(txt_path + ".tmp", txt_path)
+    return txt_path
+
+
+def make_config(voice_dir: str, output_dir: str, epochs: int = 10, batch_size: int = 32,
+                lr: Optional[float] = None, loader_workers: int = 2,
+                precompute_workers: Optional[int] = None) -> Tacotron2Config:
+    """Tacotron2 config for fine-tuning on one voice; batch_size is per process"""
+    audio_config = BaseAudioConfig(
+        sample_rate=22050,
+        do_trim_silence=True,
+        trim_db=60.0,
+        signal_norm=False,
+        mel_fmin=0.0,
+        mel_fmax=8000,
+        spec_gain=1.0,
+        log_func="np.log",
+        ref_level_db=20,
+        preemphasis=0.0,
+    )
+    config = Tacotron2Config(
+        audio=audio_config,
+        batch_size=batch_size,
+        eval_batch_size=max(1, batch_size // 2),
+        num_loader_workers=loader_workers,
+        num_eval_loader_workers=loader_workers,
+        run_eval=True,
+        test_delay_epochs=-1,
+        r=GRADUAL_R[0][1],
+        gradual_training=[[step, r, batch_size] for step, r in GRADUAL_R],
+        double_decoder_consistency=True,
+        epochs=epochs,
+        text_cleaner="phoneme_cleaners",
+        use_phonemes=True,
+        phoneme_language="en-us",
+        phoneme_cache_path=os.path.join(output_dir, "phoneme_cache"),
+        precompute_num_workers=precompute_workers or os.cpu_count() or 1,
+        print_step=25,
+        print_eval=True,
+        mixed_precision=False,
+        output_path=output_dir,
+        datasets=[BaseDatasetConfig(formatter="ljspeech", meta_file_train="metadata.txt", path=voice_dir)],
+    )
+    if lr is not None:
+        config.lr = lr
+    return config
+
+
+def _build(settings: Dict):
+    """Config, audio processor and tokenizer; the tokenizer fills in the config's character set"""
+    config = make_config(settings["voice_dir"], settings["output_dir"], settings["epochs"],
+                         settings["batch_size"], settings["lr"], settings["loader_workers"])
+    ap = AudioProcessor.init_from_config(config, verbose=False)
+    tokenizer, config = TTSTokenizer.init_from_config(config)
+    return config, ap, tokenizer
+
+
+def _store_path(settings: Dict) -> str:
+    return settings["features"] or os.path.join(settings["voice_dir"], "features")
+
+
+def _load(path: str) -> Dict:
+    # Checkpoints hold configs and counters besides tensors; only local, trusted files are loaded
+    return torch.load(path, map_location="cpu", weights_only=False)
+
+
+def _save(state: Dict, path: str):
+    torch.save(state, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def _load_pretrained(model: torch.nn.Module, path: str, log: Callable[[str], None]):
+    """Initialize from a pretrained checkpoint, keeping only weights whose shapes match"""
+    own = model.state_dict()
+    weights = {name: value for name, value in _load(path)["model"].items()
+               if name in own and own[name].shape == value.shape}
+    model.load_state_dict(weights, strict=False)
+    log(f" > Restored {len(weights)}/{len(own)} tensors from {path}")
+
+
+def _set_r(model: Tacotron2, config: Tacotron2Config, step: int, world_size: int):
+    """Apply the gradual training schedule; steps count samples across all processes, as in TTS"""
+    r, batch_size = config.gradual_training[0][1:]
+    for first_step, phase_r, phase_batch_size in config.gradual_training:
+        if step * world_size >= first_step:
+            r, batch_size = phase_r, phase_batch_size
+    config.r, config.batch_size = r, batch_size
+    model.decoder.set_r(r)
+    if config.bidirectional_decoder:
+        model.decoder_backward.set_r(r)
+
+
+class _TrainStep(torch.nn.Module):
+    """Runs the model's train_step as forward, so DistributedDataParallel sees the whole step"""
+
+    def __init__(self, model: Tacotron2, criterion: torch.nn.Module):
+        super().__init__()
+        self.model = model
+        self.criterion = criterion
+
+    def forward(self, batch: Dict):
+        return self.model.train_step(batch, self.criterion)
+
+
+def _evaluate(model: Tacotron2, criterion: torch.nn.Module, loader) -> float:
+    model.eval()
+    total, count = 0.0, 0
+    with torch.no_grad():
+        for batch in loader:
+            _, loss_dict = model.eval_step(model.format_batch(batch), criterion)
+            total += float(loss_dict["loss"])
+            count += 1
+    model.train()
+    return total / count if count else math.inf
+
+
+def _train(local_rank: int, settings: Dict):
+    """One training process; rank 0 evaluates and writes checkpoints"""
+    log = settings["log"]
+    world_size = settings["nnodes"] * settings["procs"]
+    rank = settings["node_rank"] * settings["procs"] + local_rank
+    torch.set_num_threads(settings["threads"])
+    if world_size > 1:
+        dist.init_process_group(
+            "gloo", init_method=f"tcp://{settings['master_addr']}:{settings['master_port']}",
+            rank=rank, world_size=world_size,
+        )
+    if rank != 0:
+        log = lambda message: None  # noqa: E731
+
+    config, ap, tokenizer = _build(settings)
+    store = FeatureStore(_store_path(settings))
+    train_indices, eval_indices = store.split(config.eval_split_size, config.eval_split_max_size)
+    model = Tacotron2(config, ap, tokenizer, speaker_manager=None)
+    criterion = model.get_criterion()
+    optimizer = model.get_optimizer()
+    scheduler = model.get_scheduler(optimizer)
+
+    # Rank 0 reads the checkpoint and sends it on, so other nodes need not see the run directory
+    output_dir = settings["output_dir"]
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+    state = None
+    if rank == 0:
+        os.makedirs(output_dir, exist_ok=True)
+        config.save_json(os.path.join(output_dir, CONFIG_NAME))
+        if settings["resume"] and os.path.exists(checkpoint_path):
+            state = _load(checkpoint_path)
+            log(f" > Resuming from step {state['step']} (epoch {state['epoch']})")
+        elif settings["restore_path"]:
+            _load_pretrained(model, settings["restore_path"], log)
+    if world_size > 1:
+        shared = [state]
+        dist.broadcast_object_list(shared, src=0)
+        state = shared[0]
+
+    step = epoch = 0
+    best_loss = math.inf
+    if state is not None:
+        model.load_state_dict(state["model"])
+        optimizer.load_state_dict(state["optimizer"])
+        if scheduler is not None and state.get("scheduler") is not None:
+            scheduler.load_state_dict(state["scheduler"])
+        step, epoch, best_loss = state["step"], state["epoch"], state["best_loss"]
+        state = None
+
+    def checkpoint(epoch_done: int) -> Dict:
+        return {
+            "model": model.state_dict(),
+            "optimizer": optimizer.state_dict(),
+            "scheduler": scheduler.state_dict() if scheduler is not None else None,
+            "step": step,
+            "epoch": epoch_done,
+            "best_loss": best_loss,
+            "r": model.decoder.r,
+            "config": config.to_dict(),
+        }
+
+    # Parameters are broadcast from rank 0 here, so every replica starts identical
+    step_module = _TrainStep(model, criterion)
+    if world_size > 1:
+        step_module = DistributedDataParallel(step_module, find_unused_parameters=True)
+    train_loader = make_loader(store, train_indices, config, False, world_size, rank)
+    train_loader.batch_sampler.epoch = epoch  # Resumed runs continue the same shuffle sequence
+    eval_loader = make_loader(store, eval_indices, config, True) if rank == 0 else None
+
+    writer = None
+    if rank == 0:
+        try:
+            from torch.utils.tensorboard import SummaryWriter
+            writer = SummaryWriter(output_dir)
+        except ImportError:
+            pass
+
+    accum = settings["grad_accum"]
+    grad_clip = config.grad_clip
+    scheduler_after_epoch = getattr(config, "scheduler_after_epoch", True)
+    log(f" > Training on {len(train_indices)} clips, {world_size} process(es), "
+        f"{config.batch_size} x {accum} clips per step per process")
+    for epoch in range(epoch, config.epochs):
+        _set_r(model, config, step, world_size)
+        model.train()
+        optimizer.zero_grad()
+        batches = len(train_loader)
+        started = time.monotonic()
+        for i, batch in enumerate(train_loader):
+            batch = model.format_batch(batch)
+            boundary = (i + 1) % accum == 0 or i + 1 == batches
+            # Gradients are all-reduced only on the last micro-batch of each step
+            sync = contextlib.nullcontext() if boundary or world_size == 1 else step_module.no_sync()
+            with sync:
+                _, loss_dict = step_module(batch)
+                (loss_dict["loss"] / accum).backward()
+            if not boundary:
+                continue
+
+            if grad_clip:
+                torch.nn.utils.clip_grad_norm_(model.parameters(), grad_clip)
+            optimizer.step()
+            optimizer.zero_grad()
+            if scheduler is not None and not scheduler_after_epoch:
+                scheduler.step()
+            step += 1
+
+            if step % config.print_step == 0:
+                loss = float(loss_dict["loss"])
+                log(f" > epoch {epoch + 1}/{config.epochs} step {step} loss {loss:.4f} r {config.r} "
+                    f"({(time.monotonic() - started) / (i + 1):.2f}s/batch)")
+                if writer is not None:
+                    writer.add_scalar("train/loss", loss, step)
+                    writer.add_scalar("train/lr", optimizer.param_groups[0]["lr"], step)
+            if rank == 0 and step % settings["checkpoint_every"] == 0:
+                _save(checkpoint(epoch), checkpoint_path)  # resumes at the start of this epoch
+
+        if scheduler is not None and scheduler_after_epoch:
+            scheduler.step()
+        if rank == 0:
+            eval_loss = _evaluate(model, criterion, eval_loader)
+            log(f" > epoch {epoch + 1}/{config.epochs} eval loss {eval_loss:.4f}")
+            if writer is not None:
+                writer.add_scalar("eval/loss", eval_loss, step)
+            if eval_loss < best_loss:
+                best_loss = eval_loss
+                _save(checkpoint(epoch + 1), os.path.join(output_dir, BEST_MODEL_NAME))
+            _save(checkpoint(epoch + 1), checkpoint_path)
+        if world_size > 1:
+            dist.barrier()
+
+    if writer is not None:
+        writer.close()
+    if world_size > 1:
+        dist.destroy_process_group()
+
+
+def finetune(voice_dir: str, output_dir: Optional[str] = None, features: Optional[str] = None,
+             epochs: int = 10, batch_size: int = 32, grad_accum: int = 1, lr: Optional[float] = None,
+             restore_path: Optional[str] = None, resume: bool = False, procs: int = 1, nnodes: int = 1,
+             node_rank: int = 0, master_addr: str = "127.0.0.1", master_port: int = 29500,
+             threads: Optional[int] = None, loader_workers: int = 2, checkpoint_every: int = 1000,
+             log: Callable[[str], None] = print) -> str:
+    """Fine-tune Tacotron2 on a voice directory (metadata.json or metadata.txt plus wavs/)
+
+    Runs procs training processes on this node; across nnodes nodes, start
+    the same command on each with its node_rank and the master address of
+    node 0. Each node builds its own feature store before training starts.
+    The effective batch is batch_size x grad_accum x procs x nnodes clips.
+    With resume, training continues from the run's checkpoint.pth;
+    otherwise restore_path (a pretrained model) gives the starting weights.
+    Returns the run directory.
+    """
+    voice_dir = os.path.abspath(voice_dir)
+    speaker = os.path.basename(voice_dir.rstrip(os.sep))
+    settings = {
+        "voice_dir": voice_dir,
+        "output_dir": os.path.abspath(output_dir or f"run-{speaker}"),
+        "features": features,
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "grad_accum": max(1, grad_accum),
+        "lr": lr,
+        "restore_path": restore_path,
+        "resume": resume,
+        "procs": max(1, procs),
+        "nnodes": max(1, nnodes),
+        "node_rank": node_rank,
+        "master_addr": master_addr,
+        "master_port": master_port,
+        # Processes share the node's cores
+        "threads": threads or max(1, (os.cpu_count() or 1) // max(1, procs)),
+        "loader_workers": loader_workers,
+        "checkpoint_every": checkpoint_every,
+        "log": log,
+    }
+
+    write_ljspeech_metadata(voice_dir)
+    config, _, _ = _build(settings)
+    FeatureStore.open(_store_path(settings), voice_dir, config, workers=config.precompute_num_workers)
+
+    if settings["procs"] * settings["nnodes"] == 1:
+        _train(0, settings)
+    else:
+        torch.multiprocessing.spawn(_train, args=(settings,), nprocs=settings["procs"])
+    return settings["output_dir"]
@@ -0,0 +1,191 @@
+"""
+Book ingestion for audiobook generation
+Turns plain-text and EPUB files into a lazy stream of chapter chunks for create_audiobook
+"""
+
+import os
+import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .splitter import Chunk, iter_file_chunks, split_text
+
+EPUB_SUFFIXES = (".epub",)
+
+# Elements whose boundaries are paragraph breaks in the extracted text
+BLOCK_TAGS = (
+    "p", "div", "section", "article", "aside", "blockquote", "pre", "li", "ul", "ol",
+    "dl", "dt", "dd", "table", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr",
+    "figure", "figcaption", "header", "footer",
+)
+SKIP_TAGS = ("head", "script", "style", "title")
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+
+def is_epub(file_path: Union[str, Path]) -> bool:
+    return Path(file_path).suffix.lower() in EPUB_SUFFIXES
+
+
+def iter_book_chunks(file_path: Union[str, Path], max_length: int = 10000,
+                     workers: Optional[int] = None) -> Iterator[Chunk]:
+    """Lazily split a book file (plain text or EPUB) into chapter chunks"""
+    if is_epub(file_path):
+        return iter_epub_chunks(file_path, max_length, workers)
+    return iter_file_chunks(file_path, max_length)
+
+
+def iter_epub_chunks(file_path: Union[str, Path], max_length: int = 10000,
+                     workers: Optional[int] = None) -> Iterator[Chunk]:
+    """Chunks of each EPUB chapter in reading order; a chunk never spans two chapters
+
+    Offsets refer to the extracted text with chapters separated by a blank line.
+    """
+    base = 0
+    for title, text in iter_epub_chapters(file_path, workers):
+        for chunk in split_text(text, max_length):
+            yield Chunk(chunk, base + chunk.start, base + chunk.end, title)
+        base += len(text) + 2
+
+
+def iter_epub_chapters(file_path: Union[str, Path],
+                       workers: Optional[int] = None) -> Iterator[Tuple[Optional[str], str]]:
+    """Yield (title, text) for each chapter of an EPUB in spine order
+
+    A spine document listed in the table of contents starts a new chapter;
+    documents that are not (continuation files, split chapters) are appended to
+    the chapter before them. HTML is converted to text on a thread pool and
+    chapters are yielded as soon as their documents are parsed.
+    """
+    try:
+        import ebooklib
+        from ebooklib import epub
+    except ImportError:
+        raise ImportError("EPUB support requires ebooklib: pip install ebooklib")
+
+    book = epub.read_epub(str(file_path))
+    toc_titles = _toc_titles(book.toc)
+
+    documents = []  # (file name, html bytes) in reading order
+    for idref, linear in book.spine:
+        item = book.get_item_with_id(idref)
+        if item is None or item.get_type() != ebooklib.ITEM_DOCUMENT or linear == "no":
+            continue
+        if isinstance(item, epub.EpubNav):
+            continue
+        documents.append((item.get_name(), item.get_content()))
+
+    # TOC hrefs are relative to the NCX/nav file, which may not sit beside the OPF
+    titles = {name: toc_titles.get(name, toc_titles.get(posixpath.basename(name)))
+              for name, _content in documents}
+    starts = {name for name, chapter_title in titles.items() if chapter_title is not None}
+
+    title = None
+    parts = []
+    for (name, _content), text in zip(documents, _parse_documents(documents, workers)):
+        # Without a usable TOC every document is its own chapter
+        if name in starts or not starts:
+            if parts:
+                yield title, "\n\n".join(parts)
+            title = titles[name] or None
+            parts = []
+        if text:
+            parts.append(text)
+    if parts:
+        yield title, "\n\n".join(parts)
+
+
+def _toc_titles(toc) -> Dict[str, str]:
+    """Map document file name -> title of the first TOC entry pointing into it"""
+    titles = {}
+
+    def visit(entries):
+        for entry in entries:
+            if isinstance(entry, tuple):
+                section, children = entry
+                add(section)
+                visit(children)
+            else:
+                add(entry)
+
+    def add(entry):
+        href = getattr(entry, "href", None)
+        if href:
+            name = href.split("#", 1)[0]
+            titles.setdefault(name, getattr(entry, "title", None) or "")
+            titles.setdefault(posixpath.basename(name), titles[name])
+
+    visit(toc)
+    return titles
+
+
+def _parse_documents(documents: List[Tuple[str, bytes]], workers: Optional[int]) -> Iterator[str]:
+    """html_to_text over documents in order, in parallel when there is more than one"""
+    contents = [content for _name, content in documents]
+    workers = min(workers or os.cpu_count() or 1, len(contents))
+    if workers <= 1:
+        yield from map(html_to_text, contents)
+        return
+    # Threads, not processes: lxml parses without holding the GIL, and a process pool would have
+    # to spawn interpreters that re-import the model stack through the read2me package
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(html_to_text, contents)
+
+
+def html_to_text(html: bytes) -> str:
+    """Readable text of an (X)HTML document, one paragraph per block element"""
+    try:
+        text = _lxml_text(html)
+    except Exception:
+        # Not installed, or a document lxml cannot make sense of
+        text = _stdlib_text(html)
+    paragraphs = (" ".join(p.split()) for p in _PARAGRAPH_BREAK.split(text))
+    return "\n\n".join(p for p in paragraphs if p)
+
+
+def _lxml_text(html: bytes) -> str:
+    import lxml.html
+
+    root = lxml.html.document_fromstring(html)
+    for element in list(root.iter(*SKIP_TAGS)):
+        element.drop_tree()
+    body = root.find("body")
+    if body is None:
+        body = root
+    for element in body.iter(*BLOCK_TAGS):
+        element.text = "\n\n" + (element.text or "")
+        element.tail = "\n\n" + (element.tail or "")
+    return body.text_content()
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def _stdlib_text(html: bytes) -> str:
+    parser = _TextExtractor()
+    parser.feed(html.decode("utf-8", errors="replace") if isinstance(html, bytes) else html)
+    parser.close()
+    return "".join(parser.parts)
@@ -0,0 +1,104 @@
+"""
+Job manifest for resumable audiobook generation
+Written after every chapter so an interrupted job can continue from the first unfinished chapter
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def chunk_hash(text: str) -> str:
+    """SHA-256 of a chapter's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class JobManifest:
+    """Per-chapter status, text hash and output path for one audiobook job"""
+
+    def __init__(self, book_dir: Path, settings: Dict, total_chapters: Optional[int] = None):
+        self.book_dir = Path(book_dir)
+        self.path = self.book_dir / MANIFEST_FILENAME
+        self.settings = settings
+        self.total_chapters = total_chapters
+        self.status = "processing"
+        self.chapters = {}  # chapter number (str) -> entry
+
+    @classmethod
+    def load(cls, book_dir: Path, settings: Dict) -> Optional["JobManifest"]:
+        """Load an existing manifest if it was produced with the same settings"""
+        path = Path(book_dir) / MANIFEST_FILENAME
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if data.get("settings") != settings:
+            return None
+
+        manifest = cls(book_dir, settings, data.get("total_chapters"))
+        manifest.status = data.get("status", "processing")
+        manifest.chapters = data.get("chapters", {})
+        return manifest
+
+    def completed_path(self, chapter: int, text: str) -> Optional[str]:
+        """Output path of a finished chapter whose text and file still match, else None"""
+        entry = self.chapters.get(str(chapter))
+        if not entry or entry.get("status") != "complete":
+            return None
+        if entry.get("hash") != chunk_hash(text):
+            return None
+
+        path = Path(entry["path"])
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        if size != entry.get("bytes"):
+            return None
+        return str(path)
+
+    def mark_complete(self, chapter: int, text: str, path: str, **extra):
+        self.chapters[str(chapter)] = {
+            "status": "complete",
+            "hash": chunk_hash(text),
+            "path": str(path),
+            "bytes": Path(path).stat().st_size,
+            "completed_at": time.time(),
+            **extra
+        }
+        self.save()
+
+    def mark_failed(self, chapter: int, text: str, error: str):
+        self.chapters[str(chapter)] = {
+            "status": "failed",
+            "hash": chunk_hash(text),
+            "error": error,
+        }
+        self.save()
+
+    def finish(self):
+        self.status = "complete"
+        self.save()
+
+    def save(self):
+        """Atomically replace the manifest on disk"""
+        data = {
+            "settings": self.settings,
+            "status": self.status,
+            "total_chapters": self.total_chapters,
+            "chapters": self.chapters,
+            "updated_at": time.time(),
+        }
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,190 @@
+"""
+Pipeline metrics
+Per-stage timings, throughput and queue depths, exported in the Prometheus text format
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Stages timed by the pipeline
+STAGES = ("model_load", "split", "synth", "write", "encode")
+
+# Seconds; covers a single short sentence up to a long chapter on CPU
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# Synthesis time / audio time; below 1 is faster than real time
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10)
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = ((name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for name, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return "+Inf" if value == math.inf else repr(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # label values -> metric state
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, state in items:
+            lines.extend(self._render_one(key, state))
+        return lines
+
+    def _render_one(self, key: Tuple, state) -> List[str]:
+        return [f"{self.name}{_format_labels(list(zip(self.labels, key)))} {_format_value(state)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing total"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Current value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # counts, sum, count
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels) -> Tuple[float, int]:
+        """(sum, count) of observations"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[1], state[2]) if state else (0.0, 0)
+
+    def _render_one(self, key: Tuple, state) -> List[str]:
+        counts, total, count = state
+        pairs = list(zip(self.labels, key))
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(pairs + [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(pairs)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class PipelineMetrics:
+    """Timings and counters for one process's synthesis pipeline"""
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "read2me_stage_seconds", "Time per pipeline stage and chunk", labels=("stage",))
+        self.real_time_factor = Histogram(
+            "read2me_real_time_factor", "Synthesis time divided by audio duration, per chunk",
+            buckets=RTF_BUCKETS)
+        self.characters = Counter("read2me_characters_total", "Characters synthesized")
+        self.audio_seconds = Counter("read2me_audio_seconds_total", "Seconds of audio synthesized")
+        self.chapters = Counter("read2me_chapters_total", "Chapters finished, by outcome",
+                                labels=("status",))
+        self.queue_depth = Gauge("read2me_queue_depth", "Items waiting in a pipeline queue",
+                                 labels=("queue",))
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_seconds.observe(seconds, stage=stage)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time the body of a with block as one observation of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_synthesis(self, seconds: float, characters: int, audio_seconds: float):
+        """One synthesized chunk: stage time, throughput and real-time factor"""
+        self.observe_stage("synth", seconds)
+        self.characters.inc(characters)
+        self.audio_seconds.inc(audio_seconds)
+        if audio_seconds > 0:
+            self.real_time_factor.observe(seconds / audio_seconds)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in (self.stage_seconds, self.real_time_factor, self.characters,
+                       self.audio_seconds, self.chapters, self.queue_depth):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> PipelineMetrics:
+    """Return the process-wide metrics"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = PipelineMetrics()
+        return _metrics
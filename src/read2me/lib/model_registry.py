@@ -0,0 +1,185 @@
+"""
+Process-wide TTS model registry
+Loads each model once per process and shares it between generators
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from importlib import metadata
+from typing import Optional
+
+import torch
+from TTS.api import TTS
+
+from .metrics import get_metrics
+
+DEFAULT_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+
+
+def default_device() -> str:
+    """Pick the device used when none is requested"""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def model_version(model: str) -> str:
+    """Identifier that changes with the model name or the installed TTS release"""
+    for distribution in ("TTS", "coqui-tts"):
+        try:
+            return f"{model}@{metadata.version(distribution)}"
+        except metadata.PackageNotFoundError:
+            continue
+    return model
+
+
+def _available_memory_mb(device: str) -> Optional[float]:
+    """Free memory on the given device in MB, or None if unknown"""
+    if device.startswith("cuda") and torch.cuda.is_available():
+        free, _total = torch.cuda.mem_get_info(torch.device(device))
+        return free / (1024 * 1024)
+    # MemAvailable counts reclaimable page cache; free pages alone read low on any busy host
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """LRU cache of loaded TTS models keyed by (model name, device, dtype), bounded per device"""
+
+    def __init__(self, max_models: int = 2, min_free_memory_mb: float = 1024):
+        self.max_models = max_models
+        self.min_free_memory_mb = min_free_memory_mb
+        self._models = OrderedDict()  # (model, device, dtype) -> TTS
+        self._loading = {}  # (model, device, dtype) -> Future of a load in progress
+        self._lock = threading.RLock()
+
+    def get(self, model: str = DEFAULT_MODEL, device: Optional[str] = None,
+            dtype: str = "float32") -> TTS:
+        """Return a shared model instance, loading it on first use
+
+        The load runs outside the lock, so lookups of loaded models never wait
+        on it; concurrent requests for the same key wait for the one load.
+        """
+        key = (model, device or default_device(), dtype)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            future = self._loading.get(key)
+            if future is None:
+                self._make_room(key[1])
+                future = self._loading[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            with get_metrics().time("model_load"):
+                tts = self._load(*key)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._models[key] = tts
+            del self._loading[key]
+        future.set_result(tts)
+        return tts
+
+    def register(self, tts, model: str = DEFAULT_MODEL, device: Optional[str] = None,
+                 dtype: str = "float32"):
+        """Register an already constructed model (e.g. a stub backend)"""
+        key = (model, device or default_device(), dtype)
+        with self._lock:
+            self._models[key] = tts
+            self._models.move_to_end(key)
+
+    def evict(self, model: str = DEFAULT_MODEL, device: Optional[str] = None,
+              dtype: str = "float32") -> bool:
+        """Drop a model from the registry; generators holding it keep their reference"""
+        key = (model, device or default_device(), dtype)
+        with self._lock:
+            if key not in self._models:
+                return False
+            del self._models[key]
+        self._release(key[1])
+        return True
+
+    def clear(self):
+        """Drop every loaded model"""
+        with self._lock:
+            devices = {key[1] for key in self._models}
+            self._models.clear()
+        for device in devices:
+            self._release(device)
+
+    def loaded(self) -> list:
+        """Keys of loaded models, least recently used first"""
+        with self._lock:
+            return list(self._models.keys())
+
+    def _make_room(self, device: str):
+        """Evict this device's least recently used models until the new one fits
+
+        max_models applies per device, so a model on one GPU never evicts
+        another GPU's; loads in progress count too.
+        """
+        while True:
+            loaded = [key for key in self._models if key[1] == device]
+            loading = sum(1 for key in self._loading if key[1] == device)
+            if not loaded or (len(loaded) + loading < self.max_models
+                              and not self._under_memory_pressure(device)):
+                return
+            del self._models[loaded[0]]
+            self._release(device)
+
+    def _under_memory_pressure(self, device: str) -> bool:
+        free_mb = _available_memory_mb(device)
+        return free_mb is not None and free_mb < self.min_free_memory_mb
+
+    @staticmethod
+    def _release(device: str):
+        if device.startswith("cuda") and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    @staticmethod
+    def _load(model: str, device: str, dtype: str) -> TTS:
+        tts = TTS(model).to(device)
+        if dtype != "float32":
+            tts = tts.to(getattr(torch, dtype))
+        tts.eval()
+        return tts
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(
+                max_models=int(os.environ.get("READ2ME_MAX_MODELS", "2")),
+                min_free_memory_mb=float(os.environ.get("READ2ME_MIN_FREE_MEMORY_MB", "1024")),
+            )
+        return _registry
+
+
+def get_model(model: str = DEFAULT_MODEL, device: Optional[str] = None,
+              dtype: str = "float32") -> TTS:
+    """Shortcut for get_registry().get(...)"""
+    return get_registry().get(model, device, dtype)
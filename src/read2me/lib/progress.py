@@ -0,0 +1,116 @@
+"""
+Structured progress reporting
+Progress events with chapter, character and audio counts and an ETA from the observed real-time factor
+"""
+
+import time
+from typing import Callable, Dict, Optional
+
+# Event stages, in the order a job goes through them
+STAGES = ("start", "split", "skipped", "chapter", "synthesized", "assemble", "complete")
+
+
+class ProgressEvent(str):
+    """A progress message that also carries structured fields
+
+    A str (the human-readable message), so callbacks that print or store
+    messages keep working; to_dict() gives the fields for JSON clients.
+    Counts cover the whole job, including chapters reused on resume.
+    """
+
+    FIELDS = ("stage", "chapter", "total_chapters", "chars_done", "chars_total",
+              "audio_seconds", "elapsed", "real_time_factor", "eta_seconds")
+
+    def __new__(cls, message: str, stage: str, chapter: Optional[int] = None,
+                total_chapters: Optional[int] = None, chars_done: int = 0,
+                chars_total: Optional[int] = None, audio_seconds: float = 0.0,
+                elapsed: float = 0.0, real_time_factor: Optional[float] = None,
+                eta_seconds: Optional[float] = None):
+        event = super().__new__(cls, message)
+        event.stage = stage
+        event.chapter = chapter
+        event.total_chapters = total_chapters
+        event.chars_done = chars_done
+        event.chars_total = chars_total
+        event.audio_seconds = audio_seconds
+        event.elapsed = elapsed
+        event.real_time_factor = real_time_factor
+        event.eta_seconds = eta_seconds
+        return event
+
+    def __reduce__(self):
+        return (ProgressEvent, (str(self),) + tuple(getattr(self, name) for name in self.FIELDS))
+
+    def to_dict(self) -> Dict:
+        event = {"message": str(self)}
+        for name in self.FIELDS:
+            value = getattr(self, name)
+            event[name] = round(value, 3) if isinstance(value, float) else value
+        return event
+
+
+class ProgressTracker:
+    """Turns pipeline milestones into ProgressEvents for a progress callback
+
+    The ETA is the characters still to go times the audio produced per
+    character so far, times the real-time factor (wall time / audio time)
+    observed since synthesis started. Chapters reused on resume count as done
+    but not towards the rate.
+    """
+
+    def __init__(self, callback: Optional[Callable[[str], None]], chars_total: Optional[int] = None,
+                 total_chapters: Optional[int] = None):
+        self.callback = callback
+        self.chars_total = chars_total
+        self.total_chapters = total_chapters
+        self.chars_done = 0
+        self.audio_seconds = 0.0
+        self._started = time.monotonic()
+        self._synth_started = None  # when the first chapter in this run started synthesizing
+        self._synth_chars = 0
+        self._synth_audio = 0.0
+
+    def emit(self, stage: str, message: str, chapter: Optional[int] = None):
+        if self.callback is None:
+            return
+        rtf = eta = None
+        if self._synth_audio > 0:
+            rtf = (time.monotonic() - self._synth_started) / self._synth_audio
+            if self.chars_total is not None:
+                remaining = max(0, self.chars_total - self.chars_done)
+                eta = remaining * (self._synth_audio / self._synth_chars) * rtf
+        if stage == "complete":
+            eta = 0.0
+        self.callback(ProgressEvent(
+            message, stage, chapter=chapter, total_chapters=self.total_chapters,
+            chars_done=self.chars_done, chars_total=self.chars_total,
+            audio_seconds=self.audio_seconds, elapsed=time.monotonic() - self._started,
+            real_time_factor=rtf, eta_seconds=eta
+        ))
+
+    def synthesis_started(self):
+        """Start the clock for the real-time factor (first call only)"""
+        if self._synth_started is None:
+            self._synth_started = time.monotonic()
+
+    def chapter_started(self, chapter: int, message: str):
+        self.synthesis_started()
+        self.emit("chapter", message, chapter)
+
+    def chapter_skipped(self, chapter: int, chars: int, audio_seconds: Optional[float], message: str):
+        self.chars_done += chars
+        self.audio_seconds += audio_seconds or 0.0
+        self.emit("skipped", message, chapter)
+
+    def chapter_synthesized(self, chapter: int, chars: int, audio_seconds: float, message: str):
+        self.synthesis_started()
+        self.chars_done += chars
+        self.audio_seconds += audio_seconds
+        self._synth_chars += chars
+        self._synth_audio += audio_seconds
+        self.emit("synthesized", message, chapter)
+
+    def complete(self, message: str):
+        if self.chars_total is not None:
+            self.chars_done = self.chars_total
+        self.emit("complete", message)
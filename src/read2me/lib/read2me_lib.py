@@ -6,26 +6,59 @@ Designed for integration with web applications
 import os
 import json
 import uuid
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Callable
+from typing import Optional, List, Dict, Callable, Iterable, Iterator, Union
+import numpy as np
 import torch
-from TTS.api import TTS
+from .batching import BatchedSynthesizer, model_lock
+from .audio_writer import AudioWriter, write_wav
+from .encoding import CHAPTER_FORMATS, OUTPUT_FORMATS, ChapterEncoder, assemble_m4b, encode_file
+from .model_registry import DEFAULT_MODEL, ModelRegistry, default_device, get_registry, model_version
+from .ingest import is_epub, iter_book_chunks
+from .job_manifest import JobManifest
+from .metrics import get_metrics
+from .progress import ProgressTracker
+from .segment_cache import SegmentCache
+from .speaker_cache import SpeakerHandle, SpeakerLatentCache, get_speaker_cache
+from .splitter import split_sentences, split_text
+from .streaming import STREAM_FORMATS, encode_stream, pcm16
 
 class AudiobookGenerator:
     """Main class for generating audiobooks from text"""
     
-    def __init__(self, output_dir: str = "output", model: str = "tts_models/multilingual/multi-dataset/xtts_v2"):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+    def __init__(self, output_dir: str = "output", model: str = DEFAULT_MODEL,
+                 device: Optional[str] = None, dtype: str = "float32",
+                 registry: Optional[ModelRegistry] = None,
+                 speaker_cache: Optional[SpeakerLatentCache] = None,
+                 segment_cache: Optional[SegmentCache] = None):
+        self.device = device or default_device()
+        self.dtype = dtype
         self.model = model
+        self.registry = registry or get_registry()
+        self.speaker_cache = speaker_cache or get_speaker_cache()
+        self.segment_cache = segment_cache  # Opt-in: reuse audio for unchanged sentences
+        self.metrics = get_metrics()  # Process-wide, shared with the writer and encoder
         self.tts = None
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.voice_samples_dir = Path("voice_samples")
         
     def _init_tts(self):
-        """Initialize TTS model (lazy loading)"""
-        if self.tts is None:
-            self.tts = TTS(self.model).to(self.device)
+        """Fetch the shared TTS model from the registry (lazy loading)"""
+        self.tts = self.registry.get(self.model, self.device, self.dtype)
+    
+    def get_speaker_handle(self, voice_file: str) -> SpeakerHandle:
+        """Get conditioning latents for a voice sample, cached by content hash and model version"""
+        self._init_tts()
+        xtts = BatchedSynthesizer(self.tts).xtts
+        if xtts is None:
+            raise ValueError(f"Model {self.model} does not support speaker handles")
+        return self.speaker_cache.get(xtts, voice_file, model_version(self.model))
     
     def get_available_voices(self) -> List[str]:
         """Get list of available built-in voices"""
@@ -43,7 +76,11 @@ class AudiobookGenerator:
                       voice_file: Optional[str] = None,
                       language: str = "en",
                       output_filename: Optional[str] = None,
-                      progress_callback: Optional[Callable[[str], None]] = None) -> str:
+                      progress_callback: Optional[Callable[[str], None]] = None,
+                      batch_size: int = 1,
+                      sentence_silence: float = 0.2,
+                      speaker_handle: Optional[SpeakerHandle] = None,
+                      output_format: str = "wav") -> str:
         """
         Generate audio from text
         
@@ -54,10 +91,17 @@ class AudiobookGenerator:
             language: Language code
             output_filename: Custom output filename
             progress_callback: Function to call with progress updates
+            batch_size: Sentences per model pass; above 1 uses the batched engine
+            sentence_silence: Seconds of silence between sentences (batched engine)
+            speaker_handle: Precomputed voice from get_speaker_handle (replaces voice_file)
+            output_format: "wav", "opus" or "mp3" (compressed formats need ffmpeg)
             
         Returns:
             Path to generated audio file
         """
+        if output_format not in CHAPTER_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        
         self._init_tts()
         
         if progress_callback:
@@ -74,129 +118,381 @@ class AudiobookGenerator:
             if progress_callback:
                 progress_callback("Generating audio...")
             
+            wav = self.synthesize(
+                text,
+                voice=voice,
+                voice_file=voice_file,
+                language=language,
+                batch_size=batch_size,
+                sentence_silence=sentence_silence,
+                speaker_handle=speaker_handle
+            )
+            if output_format == "wav":
+                write_wav(str(output_path), wav, self.tts.synthesizer.output_sample_rate)
+            else:
+                # Encode from a WAV of its own; the requested name may already carry the target extension
+                encoded_path = output_path.with_suffix(OUTPUT_FORMATS[output_format]["extension"])
+                wav_path = output_path.with_suffix(f".{uuid.uuid4().hex[:8]}.wav")
+                write_wav(str(wav_path), wav, self.tts.synthesizer.output_sample_rate)
+                try:
+                    output_path = encode_file(str(wav_path), output_format, output_path=str(encoded_path))
+                finally:
+                    if wav_path.exists():
+                        wav_path.unlink()
+            
+            if progress_callback:
+                progress_callback("Audio generation complete")
+            
+            return str(output_path)
+            
+        except Exception as e:
+            if progress_callback:
+                progress_callback(f"Error: {e}")
+            raise e
+    
+    def synthesize(self,
+                   text: str,
+                   voice: Optional[str] = None,
+                   voice_file: Optional[str] = None,
+                   language: str = "en",
+                   batch_size: int = 1,
+                   sentence_silence: float = 0.2,
+                   speaker_handle: Optional[SpeakerHandle] = None) -> np.ndarray:
+        """
+        Synthesize text to a float32 waveform without writing it anywhere
+        
+        Arguments are as for generate_audio. The sample rate is
+        self.tts.synthesizer.output_sample_rate. Each call is recorded in
+        self.metrics (synthesis time, characters, real-time factor).
+        """
+        self._init_tts()
+        
+        start = time.perf_counter()
+        wav = self._synthesize(text, voice, voice_file, language, batch_size, sentence_silence,
+                               speaker_handle)
+        self.metrics.observe_synthesis(time.perf_counter() - start, len(text),
+                                       len(wav) / self.tts.synthesizer.output_sample_rate)
+        return wav
+    
+    def _synthesize(self, text: str, voice: Optional[str], voice_file: Optional[str], language: str,
+                    batch_size: int, sentence_silence: float,
+                    speaker_handle: Optional[SpeakerHandle]) -> np.ndarray:
+        synthesizer = BatchedSynthesizer(
+            self.tts, batch_size, sentence_silence,
+            segment_cache=self.segment_cache,
+            model_version=model_version(self.model)
+        )
+        if voice_file and speaker_handle is None and synthesizer.xtts is not None:
+            # Reuse cached conditioning latents instead of recomputing them per call
+            speaker_handle = self.get_speaker_handle(voice_file)
+        
+        if batch_size > 1 or speaker_handle is not None or self.segment_cache is not None:
+            # Sentence-level synthesis (batched, cached and/or with precomputed speaker latents)
+            conditioning = None
+            voice_id = f"speaker:{voice or 'Ana Florence'}"
+            if speaker_handle is not None:
+                conditioning = speaker_handle.to(synthesizer.xtts.device).latents
+                voice_id = f"clone:{speaker_handle.key}"
+            elif voice_file:
+                voice_id = None  # No stable id for the voice without a handle
+            return synthesizer.synthesize(
+                text,
+                language=language,
+                speaker=None if voice_file else (voice or "Ana Florence"),
+                speaker_wav=voice_file,
+                conditioning=conditioning,
+                voice_id=voice_id
+            )
+        
+        # The model is shared across threads through the registry
+        with model_lock(self.tts):
             if voice_file:
                 # Voice cloning
-                self.tts.tts_to_file(
+                wav = self.tts.tts(
                     text=text,
                     speaker_wav=voice_file,
-                    file_path=str(output_path),
                     language=language
                 )
-            elif voice:
-                # Built-in voice
-                self.tts.tts_to_file(
-                    text=text,
-                    file_path=str(output_path),
-                    speaker=voice,
-                    language=language,
-                    split_sentences=True
-                )
             else:
-                # Default voice
-                self.tts.tts_to_file(
+                # Built-in or default voice
+                wav = self.tts.tts(
                     text=text,
-                    file_path=str(output_path),
-                    speaker="Ana Florence",
+                    speaker=voice or "Ana Florence",
                     language=language,
                     split_sentences=True
                 )
+        return np.asarray(wav, dtype=np.float32)
+    
+    def stream_audio(self,
+                     text: str,
+                     voice: Optional[str] = None,
+                     voice_file: Optional[str] = None,
+                     language: str = "en",
+                     speaker_handle: Optional[SpeakerHandle] = None,
+                     audio_format: str = "pcm",
+                     sentence_silence: float = 0.2) -> Iterator[bytes]:
+        """
+        Synthesize text sentence by sentence, yielding audio as soon as each sentence is ready
+        
+        Args:
+            text: Text to synthesize
+            voice: Built-in voice name
+            voice_file: Path to voice sample for cloning
+            language: Language code
+            speaker_handle: Precomputed voice from get_speaker_handle (replaces voice_file)
+            audio_format: "pcm" (16-bit mono), "wav" (streaming header) or "opus" (Ogg, needs ffmpeg)
+            sentence_silence: Seconds of silence between sentences
             
-            if progress_callback:
-                progress_callback("Audio generation complete")
-            
-            return str(output_path)
-            
-        except Exception as e:
-            if progress_callback:
-                progress_callback(f"Error: {e}")
-            raise e
+        Returns:
+            Iterator of encoded audio chunks
+        """
+        if audio_format not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {audio_format}")
+        
+        self._init_tts()
+        synthesizer = BatchedSynthesizer(
+            self.tts, 1, sentence_silence,
+            segment_cache=self.segment_cache,
+            model_version=model_version(self.model)
+        )
+        if voice_file and speaker_handle is None and synthesizer.xtts is not None:
+            speaker_handle = self.get_speaker_handle(voice_file)
+        
+        conditioning = None
+        voice_id = f"speaker:{voice or 'Ana Florence'}"
+        if speaker_handle is not None:
+            conditioning = speaker_handle.to(synthesizer.xtts.device).latents
+            voice_id = f"clone:{speaker_handle.key}"
+        elif voice_file:
+            voice_id = None
+        
+        def pcm_chunks():
+            gap = pcm16(np.zeros(int(synthesizer.sample_rate * sentence_silence), dtype=np.float32))
+            for i, sentence in enumerate(split_sentences(text, synthesizer.sentence_limit(language))):
+                wav, = synthesizer.synthesize_sentences(
+                    [sentence],
+                    language=language,
+                    speaker=None if voice_file else (voice or "Ana Florence"),
+                    speaker_wav=voice_file,
+                    conditioning=conditioning,
+                    voice_id=voice_id
+                )
+                yield (gap if i else b"") + pcm16(wav)
+        
+        return encode_stream(pcm_chunks(), synthesizer.sample_rate, audio_format)
     
     def create_audiobook(self,
-                        text: str,
+                        text: Union[str, Iterable[str]],
                         title: str,
                         voice: Optional[str] = None,
                         voice_file: Optional[str] = None,
                         language: str = "en",
                         max_chapter_length: int = 10000,
-                        progress_callback: Optional[Callable[[str], None]] = None) -> Dict:
+                        progress_callback: Optional[Callable[[str], None]] = None,
+                        workers: int = 1,
+                        batch_size: int = 1,
+                        speaker_handle: Optional[SpeakerHandle] = None,
+                        resume: bool = False,
+                        output_format: str = "wav",
+                        m4b: bool = False,
+                        bitrate: Optional[str] = None,
+                        pipeline: bool = False,
+                        total_chars: Optional[int] = None,
+                        book_dir: Optional[str] = None) -> Dict:
         """
         Create a complete audiobook from text
         
         Args:
-            text: Full book text
+            text: Full book text, or an iterable of chapter chunks consumed lazily
+                  (e.g. from splitter.iter_file_chunks)
             title: Book title for output directory
             voice: Built-in voice name
             voice_file: Path to voice sample for cloning
             language: Language code
             max_chapter_length: Maximum characters per chapter
-            progress_callback: Function to call with progress updates
+            progress_callback: Function to call with progress updates; receives
+                               progress.ProgressEvent (a str with structured fields and an ETA)
+            workers: Number of processes synthesizing chapters in parallel
+            batch_size: Sentences per model pass (see generate_audio)
+            speaker_handle: Precomputed voice from get_speaker_handle (replaces voice_file)
+            resume: Skip chapters already completed and verified in the job manifest
+            output_format: Chapter file format: "wav", "opus" or "mp3" (encoded off the
+                           synthesis thread, needs ffmpeg)
+            m4b: Also assemble the whole book into one chaptered .m4b
+            bitrate: Encoder bitrate (defaults per format, see encoding.OUTPUT_FORMATS)
+            pipeline: Hand each synthesized chapter to a writer thread (bounded queue) and
+                      start the next chapter immediately instead of waiting on the disk
+            total_chars: Length of a streamed text, if known (enables the ETA)
+            book_dir: Directory for this book's files (default: output_dir/<title>)
             
         Returns:
             Dictionary with audiobook metadata
         """
-        if progress_callback:
-            progress_callback("Starting audiobook creation...")
+        if output_format not in CHAPTER_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        
+        tracker = ProgressTracker(progress_callback,
+                                  chars_total=len(text) if isinstance(text, str) else total_chars)
+        tracker.emit("start", "Starting audiobook creation...")
         
         # Create book output directory
-        book_dir = self.output_dir / title.replace(" ", "_")
+        book_dir = Path(book_dir) if book_dir else self.output_dir / title.replace(" ", "_")
         book_dir.mkdir(parents=True, exist_ok=True)
         
-        # Split text into chapters
-        chapters = self._split_text(text, max_chapter_length)
-        total_chapters = len(chapters)
+        # Split text into chapters; streamed chunks are only counted once they have all been read
+        total_chapters = None
+        if isinstance(text, str):
+            with self.metrics.time("split"):
+                chapters = split_text(text, max_chapter_length)
+            total_chapters = len(chapters)
+            tracker.total_chapters = total_chapters
+            tracker.emit("split", f"Split into {total_chapters} chapters")
+        else:
+            chapters = text
         
-        if progress_callback:
-            progress_callback(f"Split into {total_chapters} chapters")
+        # Source offsets and titles of each chapter (set by the splitter), recorded as chapters are consumed
+        # Pulling a chunk from a stream reads and splits its text, so that is timed per chunk
+        text_spans = []
+        def record_spans(chunks, timed):
+            chunks = iter(chunks)
+            while True:
+                start = time.perf_counter()
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                if timed:
+                    self.metrics.observe_stage("split", time.perf_counter() - start)
+                text_spans.append((getattr(chunk, "start", None), getattr(chunk, "end", None),
+                                   getattr(chunk, "title", None)))
+                yield chunk
+        chapters = record_spans(chapters, timed=total_chapters is None)
+        
+        # Options shared by every chapter's generate_audio call
+        synth_options = {
+            "voice": voice,
+            "voice_file": voice_file,
+            "language": language,
+            "batch_size": batch_size,
+            "speaker_handle": speaker_handle
+        }
+        
+        # Checkpoint after every chapter; resume only reuses output made with the same settings
+        settings = {
+            "model": self.model,
+            "voice": voice,
+            "voice_file": voice_file,
+            "speaker": speaker_handle.key if speaker_handle else None,
+            "language": language,
+            "max_chapter_length": max_chapter_length,
+            "output_format": output_format
+        }
+        manifest = JobManifest.load(book_dir, settings) if resume else None
+        if manifest is None:
+            manifest = JobManifest(book_dir, settings)
+        manifest.total_chapters = total_chapters
+        manifest.status = "processing"
+        manifest.save()
+        
+        # Compressed formats are transcoded on a separate pool while the next chapter synthesizes;
+        # the M4B is built from the WAVs, so they are kept until it is assembled
+        encoder = None
+        if output_format != "wav":
+            encoder = ChapterEncoder(output_format, bitrate, keep_source=m4b)
+        writer = AudioWriter() if pipeline and workers <= 1 else None
+        sink = _ChapterSink(manifest, encoder, writer)
         
         # Generate audio for each chapter
+        try:
+            if workers > 1:
+                if speaker_handle is not None:
+                    synth_options["speaker_handle"] = speaker_handle.to("cpu")
+                self._synthesize_chapters_parallel(
+                    chapters, book_dir, synth_options, workers, sink, total_chapters,
+                    tracker
+                )
+            else:
+                self._synthesize_chapters(chapters, book_dir, synth_options, sink, total_chapters,
+                                          tracker)
+            sink.collect(wait_all=True)
+        except BaseException:
+            # Checkpoint chapters already written or encoded, so a resumed job skips them
+            if writer is not None:
+                writer.close()
+                writer = None
+            sink.drain()
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+            if encoder is not None:
+                encoder.close()
+        
+        chapter_infos = sink.ordered_infos()
+        if not chapter_infos:
+            raise ValueError("No text to synthesize")
+        total_chapters = len(chapter_infos)
+        manifest.total_chapters = total_chapters
+        tracker.total_chapters = total_chapters
+        
+        # Per-chapter audio info was measured when each chapter was written; start_time is the
+        # cumulative position in the book (see timeline.Timeline for seeking)
         audio_files = []
-        for i, chapter_text in enumerate(chapters, 1):
-            if progress_callback:
-                progress_callback(f"Processing chapter {i}/{total_chapters}")
-            
-            chapter_filename = f"chapter_{i:02d}.wav"
-            chapter_path = book_dir / chapter_filename
-            
-            audio_path = self.generate_audio(
-                text=chapter_text,
-                voice=voice,
-                voice_file=voice_file,
-                language=language,
-                output_filename=chapter_path.name,
-                progress_callback=None  # Avoid nested callbacks
-            )
-            
-            # Move to book directory if needed
-            if Path(audio_path).parent != book_dir:
-                final_path = book_dir / chapter_filename
-                Path(audio_path).rename(final_path)
-                audio_path = str(final_path)
-            
+        position = 0.0
+        for i, (info, (text_start, text_end, chapter_title)) in enumerate(
+                zip(chapter_infos, text_spans), 1):
             audio_files.append({
                 "chapter": i,
-                "filename": chapter_filename,
-                "path": audio_path,
-                "duration": None  # Could be calculated if needed
+                "chapter_title": chapter_title,
+                "filename": Path(info["path"]).name,
+                "path": info["path"],
+                "text_start": text_start,
+                "text_end": text_end,
+                "start_time": position,
+                "duration": info.get("duration"),
+                "samples": info.get("samples"),
+                "sample_rate": info.get("sample_rate"),
+                "peak_dbfs": info.get("peak_dbfs"),
+                "rms_dbfs": info.get("rms_dbfs"),
+                "bytes": info.get("bytes"),
+                "data_offset": info.get("data_offset")
             })
+            if position is not None and info.get("duration") is not None:
+                position += info["duration"]
+            else:
+                position = None  # Unknown for a chapter checkpointed before durations were recorded
         
         # Create metadata
         metadata = {
             "title": title,
             "total_chapters": total_chapters,
-            "voice_used": voice or "voice_clone" if voice_file else "Ana Florence",
+            "voice_used": voice or "voice_clone" if voice_file or speaker_handle else "Ana Florence",
             "language": language,
             "output_directory": str(book_dir),
             "audio_files": audio_files,
-            "created_at": str(Path().ctime())
+            "total_duration": position,
+            "output_format": output_format,
+            "created_at": datetime.now().isoformat()
         }
         
+        if m4b:
+            tracker.emit("assemble", "Assembling M4B...")
+            metadata["m4b"] = assemble_m4b(
+                sink.ordered_sources(),
+                str(book_dir / f"{book_dir.name}.m4b"),
+                titles=[chapter_title for _start, _end, chapter_title in text_spans],
+                durations=[audio_file["duration"] for audio_file in audio_files],
+                book_title=title,
+                bitrate=bitrate
+            )
+            sink.remove_sources()
+        
         # Save metadata
         metadata_file = book_dir / "metadata.json"
         with open(metadata_file, 'w') as f:
             json.dump(metadata, f, indent=2)
+        manifest.finish()
         
-        if progress_callback:
-            progress_callback("Audiobook creation complete")
+        tracker.complete("Audiobook creation complete")
         
         return metadata
     
@@ -205,16 +501,34 @@ class AudiobookGenerator:
                                   voice: Optional[str] = None,
                                   voice_file: Optional[str] = None,
                                   language: str = "en",
-                                  progress_callback: Optional[Callable[[str], None]] = None) -> Dict:
+                                  progress_callback: Optional[Callable[[str], None]] = None,
+                                  workers: int = 1,
+                                  resume: bool = False,
+                                  max_chapter_length: int = 10000,
+                                  output_format: str = "wav",
+                                  m4b: bool = False,
+                                  pipeline: bool = False,
+                                  book_dir: Optional[str] = None) -> Dict:
         """
-        Create audiobook from a text file
+        Create audiobook from a text or EPUB file
+        
+        Text files are read incrementally and chapters are synthesized as soon as
+        they are split off, so memory stays proportional to one chapter. EPUBs are
+        split along their table of contents (see ingest.iter_epub_chapters).
         
         Args:
-            file_path: Path to text file
+            file_path: Path to text or EPUB file
             voice: Built-in voice name
             voice_file: Path to voice sample for cloning
             language: Language code
             progress_callback: Function to call with progress updates
+            workers: Number of processes synthesizing chapters in parallel
+            resume: Continue a previous run from its first incomplete chapter
+            max_chapter_length: Maximum characters per chapter
+            output_format: Chapter file format ("wav", "opus" or "mp3")
+            m4b: Also assemble the whole book into one chaptered .m4b
+            pipeline: Write chapters on a background thread while the next one synthesizes
+            book_dir: Directory for this book's files (default: output_dir/<file name>)
             
         Returns:
             Dictionary with audiobook metadata
@@ -226,52 +540,272 @@ class AudiobookGenerator:
         if progress_callback:
             progress_callback("Reading input file...")
         
-        # Read file content
+        # Pull the first chunk eagerly so unreadable or empty files fail before any output is made
+        chunks = iter_book_chunks(file_path, max_chapter_length)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
+            first = next(chunks, None)
         except Exception as e:
             raise ValueError(f"Error reading file: {e}")
         
-        if not text.strip():
+        if first is None:
             raise ValueError("File is empty")
         
         # Use filename as title
         title = file_path.stem
         
         return self.create_audiobook(
-            text=text,
+            text=itertools.chain([first], chunks),
             title=title,
             voice=voice,
             voice_file=voice_file,
             language=language,
-            progress_callback=progress_callback
+            max_chapter_length=max_chapter_length,
+            progress_callback=progress_callback,
+            workers=workers,
+            resume=resume,
+            output_format=output_format,
+            m4b=m4b,
+            pipeline=pipeline,
+            book_dir=book_dir,
+            # Bytes approximate characters for text; an EPUB's size says little about its text
+            total_chars=None if is_epub(file_path) else file_path.stat().st_size
         )
     
-    def _split_text(self, text: str, max_length: int) -> List[str]:
-        """Split text into chapters based on length and natural breaks"""
-        # Split by double newlines (paragraphs) first
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-        
-        chapters = []
-        current_chapter = ""
-        
-        for paragraph in paragraphs:
-            # If adding this paragraph would exceed max length
-            if current_chapter and len(current_chapter) + len(paragraph) + 2 > max_length:
-                chapters.append(current_chapter.strip())
-                current_chapter = paragraph
+    def _synthesize_chapters(self, chapters: Iterable[str], book_dir: Path, synth_options: Dict,
+                             sink: "_ChapterSink", total_chapters: Optional[int],
+                             tracker: ProgressTracker):
+        """Synthesize chapters one at a time in this process"""
+        for i, chapter_text in enumerate(chapters, 1):
+            done_path = sink.manifest.completed_path(i, chapter_text)
+            if done_path:
+                sink.skip(i, done_path)
+                tracker.chapter_skipped(i, len(chapter_text), sink.infos[i].get("duration"),
+                                        f"Chapter {i} already complete, skipping")
+                continue
+            
+            tracker.chapter_started(i, f"Processing chapter {_chapter_label(i, total_chapters)}")
+            
+            chapter_path = str(book_dir / f"chapter_{i:02d}.wav")
+            
+            try:
+                wav = self.synthesize(text=chapter_text, **synth_options)
+            except Exception as e:
+                sink.fail(i, chapter_text, str(e))
+                raise
+            
+            sample_rate = self.tts.synthesizer.output_sample_rate
+            tracker.chapter_synthesized(i, len(chapter_text), len(wav) / sample_rate,
+                                        f"Synthesized chapter {_chapter_label(i, total_chapters)}")
+            if sink.writer is not None:
+                # Pipelined: the writer thread saves this chapter while the next one synthesizes
+                sink.write(i, chapter_text, wav, sample_rate, chapter_path)
             else:
-                if current_chapter:
-                    current_chapter += "\n\n" + paragraph
-                else:
-                    current_chapter = paragraph
+                sink.add(i, chapter_text, write_wav(chapter_path, wav, sample_rate))
+    
+    def _synthesize_chapters_parallel(self, chapters: Iterable[str], book_dir: Path,
+                                      synth_options: Dict, workers: int, sink: "_ChapterSink",
+                                      total_chapters: Optional[int], tracker: ProgressTracker):
+        """Synthesize chapters in a process pool, each process pinned to its own cores
+        
+        Chapters are pulled from the iterable only as workers free up, so at most
+        2 * workers chapter texts are held in memory at once.
+        """
+        if total_chapters is not None:
+            workers = min(workers, total_chapters) or 1
+        ctx = multiprocessing.get_context("spawn")
+        core_slices = ctx.Queue()
+        for cores in _split_cores(workers):
+            core_slices.put(cores)
         
-        # Add the last chapter
-        if current_chapter.strip():
-            chapters.append(current_chapter.strip())
+        in_flight = {}  # future -> (chapter number, text)
+        synthesized = 0
         
-        return chapters
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_chapter_worker,
+            initargs=(str(book_dir), self.model, self.device, self.dtype, core_slices,
+                      self.segment_cache.path if self.segment_cache else None,
+                      self.segment_cache.max_bytes if self.segment_cache else None)
+        ) as pool:
+            def collect(return_when):
+                # Checkpoint each chapter as soon as it lands
+                nonlocal synthesized
+                done, _ = wait(in_flight, return_when=return_when)
+                for future in done:
+                    i, chapter_text = in_flight.pop(future)
+                    try:
+                        info = future.result()
+                    except Exception as e:
+                        sink.fail(i, chapter_text, str(e))
+                        raise
+                    # Stages ran in the worker process; record them here where /metrics can see them
+                    timings = info.pop("timings")
+                    self.metrics.observe_synthesis(timings["synth"], len(chapter_text), info["duration"])
+                    self.metrics.observe_stage("write", timings["write"])
+                    sink.add(i, chapter_text, info)
+                    synthesized += 1
+                    self.metrics.queue_depth.set(len(in_flight), queue="chapters")
+                    tracker.chapter_synthesized(i, len(chapter_text), info["duration"],
+                                                f"Processed chapter {i} ({synthesized} synthesized)")
+            
+            for i, chapter_text in enumerate(chapters, 1):
+                done_path = sink.manifest.completed_path(i, chapter_text)
+                if done_path:
+                    sink.skip(i, done_path)
+                    tracker.chapter_skipped(i, len(chapter_text), sink.infos[i].get("duration"),
+                                            f"Chapter {i} already complete, skipping")
+                    continue
+                tracker.synthesis_started()
+                future = pool.submit(_synthesize_chapter, {
+                    "text": chapter_text,
+                    "output_filename": f"chapter_{i:02d}.wav",
+                    **synth_options
+                })
+                in_flight[future] = (i, chapter_text)
+                self.metrics.queue_depth.set(len(in_flight), queue="chapters")
+                if len(in_flight) >= 2 * workers:
+                    collect(FIRST_COMPLETED)
+            
+            if in_flight:
+                collect(ALL_COMPLETED)
+
+class _ChapterSink:
+    """Records finished chapters in the job manifest, after the writer and encoder are done with them
+    
+    Chapters are tracked as audio info dicts (audio_writer.audio_info), measured
+    from the in-memory buffer when the chapter is written.
+    """
+    
+    def __init__(self, manifest: JobManifest, encoder: Optional[ChapterEncoder] = None,
+                 writer: Optional[AudioWriter] = None):
+        self.manifest = manifest
+        self.encoder = encoder
+        self.writer = writer
+        self.infos = {}  # chapter number -> audio info of the final output
+        self.sources = {}  # chapter number -> synthesized WAV, when kept for M4B assembly
+    
+    def skip(self, chapter: int, path: str):
+        """Reuse a chapter completed by an earlier run"""
+        audio = self.manifest.chapters[str(chapter)].get("audio") or {"duration": None}
+        self.infos[chapter] = {**audio, "path": path}
+        get_metrics().chapters.inc(status="skipped")
+        wav_path = Path(path).with_suffix(".wav")
+        if wav_path.exists():
+            self.sources[chapter] = str(wav_path)
+    
+    def add(self, chapter: int, text: str, info: Dict):
+        """A chapter WAV has been written"""
+        self._written(chapter, text, info)
+        self.collect()
+    
+    def write(self, chapter: int, text: str, wav: np.ndarray, sample_rate: int, path: str):
+        """Queue a synthesized chapter for the writer thread (blocks while its queue is full)"""
+        self.writer.submit((chapter, text), wav, sample_rate, path)
+        self.collect()
+    
+    def collect(self, wait_all: bool = False):
+        """Checkpoint chapters whose writing and encoding have finished"""
+        if self.writer is not None:
+            for (chapter, text), future in self.writer.completed(wait_all):
+                try:
+                    info = future.result()
+                except Exception as e:
+                    self.fail(chapter, text, f"Writing failed: {e}")
+                    raise
+                self._written(chapter, text, info)
+        
+        if self.encoder is not None:
+            for (chapter, text, info), future in self.encoder.completed(wait_all):
+                try:
+                    path = future.result()
+                except Exception as e:
+                    self.fail(chapter, text, f"Encoding failed: {e}")
+                    raise
+                if self.encoder.keep_source:
+                    self.sources[chapter] = info["path"]
+                # Same audio, different container: timing and loudness carry over
+                self._complete(chapter, text, {**info, "path": path, "bytes": os.path.getsize(path),
+                                               "data_offset": None})
+    
+    def drain(self):
+        """After a failure, checkpoint every chapter still in flight; failed ones are recorded and passed over"""
+        while True:
+            try:
+                self.collect(wait_all=True)
+                return
+            except Exception:
+                continue  # collect stops at a failed chapter; the rest are still pending
+    
+    def _written(self, chapter: int, text: str, info: Dict):
+        if self.encoder is None:
+            self._complete(chapter, text, info)
+        else:
+            self.encoder.submit((chapter, text, info), info["path"])
+    
+    def _complete(self, chapter: int, text: str, info: Dict):
+        audio = {key: value for key, value in info.items() if key != "path"}
+        self.manifest.mark_complete(chapter, text, info["path"], audio=audio)
+        self.infos[chapter] = info
+        get_metrics().chapters.inc(status="complete")
+    
+    def fail(self, chapter: int, text: str, error: str):
+        self.manifest.mark_failed(chapter, text, error)
+        get_metrics().chapters.inc(status="failed")
+    
+    def ordered_infos(self) -> List[Dict]:
+        return [self.infos[i] for i in sorted(self.infos)]
+    
+    def ordered_sources(self) -> List[str]:
+        """Best available input per chapter for M4B assembly (WAV if still present)"""
+        return [self.sources.get(i, self.infos[i]["path"]) for i in sorted(self.infos)]
+    
+    def remove_sources(self):
+        """Delete WAVs that were only kept for M4B assembly"""
+        for chapter, wav_path in self.sources.items():
+            if wav_path != self.infos[chapter]["path"] and os.path.exists(wav_path):
+                os.remove(wav_path)
+
+def _chapter_label(i: int, total: Optional[int]) -> str:
+    """"3/12" when the chapter count is known, "3" while chapters are still being streamed"""
+    return f"{i}/{total}" if total is not None else str(i)
+
+# Chapter worker processes for create_audiobook(workers=N)
+_worker_generator = None
+
+def _split_cores(workers: int) -> List[List[int]]:
+    """Divide the cores available to this process into one slice per worker"""
+    if hasattr(os, "sched_getaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+    per_worker = max(1, len(cores) // workers)
+    return [cores[i * per_worker:(i + 1) * per_worker] or cores for i in range(workers)]
+
+def _init_chapter_worker(output_dir: str, model: str, device: str, dtype: str, core_slices,
+                         segment_cache_path: Optional[str], segment_cache_bytes: Optional[int]):
+    """Pin the worker to its core slice and load its own model"""
+    global _worker_generator
+    cores = core_slices.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(len(cores))
+    segment_cache = None
+    if segment_cache_path:
+        segment_cache = SegmentCache(segment_cache_path, segment_cache_bytes)
+    _worker_generator = AudiobookGenerator(output_dir=output_dir, model=model, device=device,
+                                           dtype=dtype, segment_cache=segment_cache)
+
+def _synthesize_chapter(kwargs: Dict) -> Dict:
+    """Synthesize and write one chapter; returns its audio info (see audio_writer.audio_info) and stage timings"""
+    kwargs = dict(kwargs)
+    output_path = _worker_generator.output_dir / kwargs.pop("output_filename")
+    start = time.perf_counter()
+    wav = _worker_generator.synthesize(**kwargs)
+    synthesized = time.perf_counter()
+    info = write_wav(str(output_path), wav, _worker_generator.tts.synthesizer.output_sample_rate)
+    info["timings"] = {"synth": synthesized - start, "write": time.perf_counter() - synthesized}
+    return info
 
 # Convenience functions for simple usage
 def quick_tts(text: str, voice: str = None, output_file: str = None) -> str:
@@ -0,0 +1,147 @@
+"""
+Content-addressed synthesis cache
+Stores per-sentence audio in SQLite keyed by everything that influences the synthesized result
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from .speaker_cache import DEFAULT_CACHE_DIR
+
+# Rows deleted per eviction statement, bounding the work done inside one put
+EVICT_BATCH = 64
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of a sentence for cache lookups"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def segment_key(text: str, voice_id: str, language: str, model_version: str,
+                params: Optional[Dict] = None) -> str:
+    """Hash of normalized text, voice, language, model version and sampling parameters"""
+    payload = json.dumps({
+        "text": normalize_text(text),
+        "voice": voice_id,
+        "language": language,
+        "model": model_version,
+        "params": params or {},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SegmentCache:
+    """Size-bounded LRU store of synthesized sentences (float16 PCM blobs in SQLite)"""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 2 * 1024 ** 3):
+        self.path = Path(path or os.path.join(DEFAULT_CACHE_DIR, "segments.db"))
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS segments (
+                    key TEXT PRIMARY KEY,
+                    sample_rate INTEGER NOT NULL,
+                    audio BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS segments_last_access ON segments (last_access)")
+            # Running byte total, kept by triggers so every process sharing the file sees it
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS segment_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    total_bytes INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                INSERT OR IGNORE INTO segment_stats (id, total_bytes)
+                SELECT 0, COALESCE(SUM(size), 0) FROM segments
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS segments_insert AFTER INSERT ON segments BEGIN
+                    UPDATE segment_stats SET total_bytes = total_bytes + NEW.size WHERE id = 0;
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS segments_update AFTER UPDATE OF size ON segments BEGIN
+                    UPDATE segment_stats SET total_bytes = total_bytes - OLD.size + NEW.size WHERE id = 0;
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS segments_delete AFTER DELETE ON segments BEGIN
+                    UPDATE segment_stats SET total_bytes = total_bytes - OLD.size WHERE id = 0;
+                END
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers proceed while another process writes"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Cached float32 audio for key, or None"""
+        conn = self._connect()
+        row = conn.execute("SELECT audio FROM segments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE segments SET last_access = ? WHERE key = ?", (time.time(), key))
+        return np.frombuffer(row[0], dtype=np.float16).astype(np.float32)
+
+    def put(self, key: str, wav: np.ndarray, sample_rate: int):
+        """Store audio for key and evict least recently used entries over the size bound"""
+        audio = np.asarray(wav, dtype=np.float16).tobytes()
+        conn = self._connect()
+        with conn:
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete skips the triggers
+            conn.execute(
+                "INSERT INTO segments (key, sample_rate, audio, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET sample_rate = excluded.sample_rate, "
+                "audio = excluded.audio, size = excluded.size, last_access = excluded.last_access",
+                (key, sample_rate, audio, len(audio), time.time())
+            )
+        self._evict(conn)
+
+    def total_bytes(self) -> int:
+        return self._total_bytes(self._connect())
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM segments")
+
+    def _total_bytes(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT total_bytes FROM segment_stats WHERE id = 0").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        if self._total_bytes(conn) <= self.max_bytes:
+            return
+        # Evict down to 90% so the next few puts don't each trigger eviction
+        target = int(self.max_bytes * 0.9)
+        with conn:
+            while self._total_bytes(conn) > target:
+                deleted = conn.execute(
+                    "DELETE FROM segments WHERE key IN "
+                    "(SELECT key FROM segments ORDER BY last_access LIMIT ?)",
+                    (EVICT_BATCH,)
+                ).rowcount
+                if not deleted:
+                    break
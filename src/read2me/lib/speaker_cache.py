@@ -0,0 +1,151 @@
+"""
+Speaker conditioning cache for voice cloning
+Keeps XTTS conditioning latents in memory and on disk, keyed by reference audio content and model version
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import torch
+
+DEFAULT_CACHE_DIR = os.environ.get("READ2ME_CACHE_DIR", ".read2me_cache")
+
+
+class SpeakerHandle:
+    """Precomputed conditioning for one voice, accepted by AudiobookGenerator in place of a voice file"""
+
+    def __init__(self, key: str, gpt_cond_latent: torch.Tensor, speaker_embedding: torch.Tensor,
+                 source: Optional[str] = None):
+        self.key = key
+        self.gpt_cond_latent = gpt_cond_latent
+        self.speaker_embedding = speaker_embedding
+        self.source = source
+
+    @property
+    def latents(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.gpt_cond_latent, self.speaker_embedding
+
+    def to(self, device) -> "SpeakerHandle":
+        return SpeakerHandle(self.key, self.gpt_cond_latent.to(device),
+                             self.speaker_embedding.to(device), self.source)
+
+    def __repr__(self):
+        return f"SpeakerHandle({self.key[:12]}, source={self.source!r})"
+
+
+def conditioning_settings(xtts) -> dict:
+    """Reference-audio settings from the model config, as XTTS's own synthesize() passes them"""
+    config = xtts.config
+    return {
+        "gpt_cond_len": config.gpt_cond_len,
+        "gpt_cond_chunk_len": config.gpt_cond_chunk_len,
+        "max_ref_length": config.max_ref_len,
+        "sound_norm_refs": config.sound_norm_refs,
+    }
+
+
+def compute_conditioning(xtts, voice_file: str) -> Tuple[torch.Tensor, torch.Tensor]:
+    """GPT conditioning latent and speaker embedding for a voice sample, matching uncached synthesis"""
+    return xtts.get_conditioning_latents(audio_path=[voice_file], **conditioning_settings(xtts))
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SpeakerLatentCache:
+    """Two-level (memory LRU + disk) cache of XTTS conditioning latents"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_memory_entries: int = 32):
+        self.cache_dir = Path(cache_dir or os.path.join(DEFAULT_CACHE_DIR, "speakers"))
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()  # key -> SpeakerHandle
+        self._file_hashes = {}  # (path, mtime, size) -> content hash
+        self._lock = threading.Lock()
+
+    def key(self, voice_file: str, model_version: str) -> str:
+        """Cache key from the reference audio content and the model version"""
+        stat = os.stat(voice_file)
+        file_id = (os.path.abspath(voice_file), stat.st_mtime_ns, stat.st_size)
+        content_hash = self._file_hashes.get(file_id)
+        if content_hash is None:
+            content_hash = hash_file(voice_file)
+            self._file_hashes[file_id] = content_hash
+        return hashlib.sha256(f"{content_hash}:{model_version}".encode()).hexdigest()
+
+    def get(self, xtts, voice_file: str, model_version: str) -> SpeakerHandle:
+        """Return conditioning for voice_file, computing it only on a full miss"""
+        settings = ",".join(f"{name}={value}" for name, value in sorted(conditioning_settings(xtts).items()))
+        key = self.key(voice_file, f"{model_version}:{settings}")
+
+        with self._lock:
+            handle = self._memory.get(key)
+            if handle is not None:
+                self._memory.move_to_end(key)
+                return handle
+
+        handle = self._load(key, voice_file, xtts.device)
+        if handle is None:
+            gpt_cond_latent, speaker_embedding = compute_conditioning(xtts, voice_file)
+            handle = SpeakerHandle(key, gpt_cond_latent, speaker_embedding, source=voice_file)
+            self._save(handle)
+
+        self._remember(handle)
+        return handle
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, handle: SpeakerHandle):
+        with self._lock:
+            self._memory[handle.key] = handle
+            self._memory.move_to_end(handle.key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pt"
+
+    def _load(self, key: str, voice_file: str, device) -> Optional[SpeakerHandle]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            data = torch.load(path, map_location=device)
+        except Exception:
+            # Corrupt or partial entry; recompute and overwrite it
+            return None
+        return SpeakerHandle(key, data["gpt_cond_latent"], data["speaker_embedding"], source=voice_file)
+
+    def _save(self, handle: SpeakerHandle):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(handle.key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        torch.save({
+            "gpt_cond_latent": handle.gpt_cond_latent.detach().cpu(),
+            "speaker_embedding": handle.speaker_embedding.detach().cpu(),
+        }, tmp_path)
+        os.replace(tmp_path, path)
+
+
+_speaker_cache = None
+_speaker_cache_lock = threading.Lock()
+
+
+def get_speaker_cache() -> SpeakerLatentCache:
+    """Return the process-wide speaker cache"""
+    global _speaker_cache
+    with _speaker_cache_lock:
+        if _speaker_cache is None:
+            _speaker_cache = SpeakerLatentCache()
+        return _speaker_cache
@@ -0,0 +1,207 @@
+"""
+Text splitting for audiobook generation
+Linear-time, sentence-aware chunking of book text (in memory or streamed from disk) with source offsets
+"""
+
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+READ_BLOCK_SIZE = 1 << 20  # 1 MiB
+
+# XTTS warns and truncates above ~250 characters per sentence for most languages
+MAX_SENTENCE_CHARS = 250
+
+_SENTENCE_END = re.compile(r'(?:(?<=[.!?…])|(?<=[.!?…]["\'”’)\]]))\s+')
+_CLAUSE_END = re.compile(r'(?<=[,;:—])\s+')
+_WHITESPACE = re.compile(r'\s+')
+_NON_SPACE = re.compile(r'\S')
+
+
+class Chunk(str):
+    """Chapter text that remembers where it came from
+
+    A str, so it can be used anywhere chapter text is expected; start and end
+    are character offsets of the span it covers in the source text, and title
+    is the chapter title when the source has one (e.g. from an EPUB TOC).
+    """
+
+    def __new__(cls, text: str, start: int, end: int, title: Optional[str] = None):
+        chunk = super().__new__(cls, text)
+        chunk.start = start
+        chunk.end = end
+        chunk.title = title
+        return chunk
+
+    def __reduce__(self):
+        return (Chunk, (str(self), self.start, self.end, self.title))
+
+
+def split_sentences(text: str, max_chars: int = MAX_SENTENCE_CHARS) -> List[str]:
+    """Split text into sentences no longer than max_chars"""
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            sentences.append(sentence)
+            continue
+
+        # Fall back to clause boundaries, then to whitespace
+        current = []
+        current_len = 0
+        for piece in _CLAUSE_END.split(sentence):
+            for word in piece.split(" ") if len(piece) > max_chars else [piece]:
+                if current and current_len + len(word) + 1 > max_chars:
+                    sentences.append(" ".join(current))
+                    current, current_len = [], 0
+                current.append(word)
+                current_len += len(word) + 1
+        if current:
+            sentences.append(" ".join(current))
+    return sentences
+
+
+def iter_file_blocks(file_path: Union[str, Path], encoding: str = "utf-8",
+                     block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+    """Read a text file incrementally"""
+    with open(file_path, "r", encoding=encoding) as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            yield block
+
+
+def iter_paragraphs(blocks: Iterable[str], max_length: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (offset, paragraph) for each stripped, non-empty paragraph in a stream of text blocks
+
+    Paragraphs are separated by blank lines. Each block is scanned once, so the
+    cost is linear in the input even when a paragraph spans many blocks. With
+    max_length, paragraphs longer than that are cut into pieces as they are
+    read, so text without blank lines is never buffered whole; cuts do not
+    depend on where the blocks end and match splitting the stripped paragraph
+    as a whole.
+    """
+    buffer = ""
+    base = 0  # source offset of buffer[0]
+    whole = True  # the paragraph at buffer[start:] has not been cut yet
+    for block in blocks:
+        # A separator may straddle the previous block and this one
+        scan_from = max(0, len(buffer) - 1)
+        buffer += block
+        start = 0
+        while True:
+            sep = buffer.find("\n\n", max(start, scan_from))
+            if sep < 0:
+                break
+            if max_length:
+                if whole:
+                    start = _skip_space(buffer, start, sep)
+                start = yield from _cut_long(buffer, start, sep, base, max_length)
+            yield from _stripped(buffer, start, sep, base)
+            start = sep + 2
+            whole = True
+        if max_length:
+            # No separator yet, but one could only start at the last character
+            end = len(buffer) - 1
+            if whole:
+                start = _skip_space(buffer, start, end)
+            rest = yield from _cut_long(buffer, start, end, base, max_length)
+            whole = whole and rest == start
+            start = rest
+        if start:
+            buffer = buffer[start:]
+            base += start
+    yield from _stripped(buffer, 0, len(buffer), base)
+
+
+def _stripped(text: str, start: int, end: int, base: int) -> Iterator[Tuple[int, str]]:
+    raw = text[start:end]
+    stripped = raw.strip()
+    if stripped:
+        yield base + start + len(raw) - len(raw.lstrip()), stripped
+
+
+def _cut_point(text: str, start: int, max_length: int) -> int:
+    """Where to end a piece of text[start:] that is too long, preferring sentence, then clause, then word breaks"""
+    window = text[start:start + max_length + 1]
+    # Only accept a break past the middle of the window, which keeps splitting linear
+    for pattern in (_SENTENCE_END, _CLAUSE_END, _WHITESPACE):
+        cut = None
+        for match in pattern.finditer(window):
+            if match.start() > max_length:
+                break
+            cut = match.start()
+        if cut is not None and cut >= max_length // 2:
+            return start + cut
+    return start + max_length
+
+
+def _skip_space(text: str, start: int, end: int) -> int:
+    """Index of the first non-whitespace character of text[start:end], or end"""
+    first = _NON_SPACE.search(text, start, end)
+    return first.start() if first else max(start, end)
+
+
+def _cut_long(text: str, start: int, end: int, base: int, max_length: int):
+    """Yield pieces of text[start:end] while its stripped rest is longer than max_length; returns where the rest starts"""
+    # Trailing whitespace is stripped from the paragraph, so only a non-space past the window forces a cut
+    while _NON_SPACE.search(text, start + max_length, end):
+        cut = _cut_point(text, start, max_length)
+        yield from _stripped(text, start, cut, base)
+        start = cut
+    return start
+
+
+def _split_long(offset: int, paragraph: str, max_length: int) -> Iterator[Tuple[int, str]]:
+    """Break a paragraph longer than max_length into pieces that fit"""
+    start = 0
+    while len(paragraph) - start > max_length:
+        cut = _cut_point(paragraph, start, max_length)
+        yield from _stripped(paragraph, start, cut, offset)
+        start = cut
+    yield from _stripped(paragraph, start, len(paragraph), offset)
+
+
+def iter_chunks(paragraphs: Iterable[Tuple[int, str]], max_length: int) -> Iterator[Chunk]:
+    """Pack (offset, paragraph) pairs into chunks of at most max_length characters
+
+    Paragraphs are joined with a blank line; a paragraph that is longer than
+    max_length on its own is split at sentence, clause or word boundaries.
+    Chunks are yielded as soon as they are full.
+    """
+    buffer = []
+    buffer_len = 0
+    start = end = 0
+    for offset, paragraph in paragraphs:
+        pieces = [(offset, paragraph)] if len(paragraph) <= max_length else (
+            _split_long(offset, paragraph, max_length)
+        )
+        for piece_offset, piece in pieces:
+            # Separator is "\n\n" between paragraphs
+            if buffer and buffer_len + len(piece) + 2 > max_length:
+                yield Chunk("\n\n".join(buffer), start, end)
+                buffer = []
+                buffer_len = 0
+            if buffer:
+                buffer_len += 2
+            else:
+                start = piece_offset
+            buffer.append(piece)
+            buffer_len += len(piece)
+            end = piece_offset + len(piece)
+    if buffer:
+        yield Chunk("\n\n".join(buffer), start, end)
+
+
+def split_text(text: str, max_length: int) -> List[Chunk]:
+    """Split text into chapter chunks of at most max_length characters"""
+    return list(iter_chunks(iter_paragraphs([text], max_length), max_length))
+
+
+def iter_file_chunks(file_path: Union[str, Path], max_length: int = 10000,
+                     encoding: str = "utf-8") -> Iterator[Chunk]:
+    """Lazily split a text file into chapter chunks; memory stays proportional to one chunk"""
+    return iter_chunks(iter_paragraphs(iter_file_blocks(file_path, encoding), max_length), max_length)
@@ -0,0 +1,95 @@
+"""
+Streaming audio helpers
+Turns per-sentence float32 buffers into PCM, WAV or Ogg/Opus byte streams
+"""
+
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+from typing import Iterable, Iterator
+
+import numpy as np
+
+STREAM_FORMATS = {
+    "pcm": "audio/L16",
+    "wav": "audio/wav",
+    "opus": "audio/ogg",
+}
+
+
+def pcm16(wav: np.ndarray) -> bytes:
+    """Little-endian 16-bit PCM bytes for a float waveform in [-1, 1]"""
+    clipped = np.clip(np.asarray(wav, dtype=np.float32), -1.0, 1.0)
+    return (clipped * 32767).astype("<i2").tobytes()
+
+
+def wav_stream_header(sample_rate: int, channels: int = 1) -> bytes:
+    """WAV header for a stream of unknown length (sizes set to the maximum)"""
+    byte_rate = sample_rate * channels * 2
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * 2, 16)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+def encode_stream(pcm_chunks: Iterable[bytes], sample_rate: int, audio_format: str = "pcm",
+                  bitrate: str = "48k") -> Iterator[bytes]:
+    """Wrap a stream of 16-bit mono PCM chunks in the requested container"""
+    if audio_format == "pcm":
+        yield from pcm_chunks
+    elif audio_format == "wav":
+        yield wav_stream_header(sample_rate)
+        yield from pcm_chunks
+    elif audio_format == "opus":
+        yield from _opus_stream(pcm_chunks, sample_rate, bitrate)
+    else:
+        raise ValueError(f"Unsupported stream format: {audio_format}")
+
+
+def _opus_stream(pcm_chunks: Iterable[bytes], sample_rate: int, bitrate: str) -> Iterator[bytes]:
+    """Pipe PCM through ffmpeg and yield Ogg/Opus pages as soon as they are produced"""
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("ffmpeg is required for Opus streaming")
+
+    proc = subprocess.Popen(
+        ["ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1",
+         "-i", "pipe:0", "-c:a", "libopus", "-b:a", bitrate, "-flush_packets", "1",
+         "-f", "ogg", "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    pages = queue.Queue()
+
+    def read_output():
+        while True:
+            data = proc.stdout.read1(65536)
+            if not data:
+                break
+            pages.put(data)
+        pages.put(None)
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+
+    try:
+        for chunk in pcm_chunks:
+            proc.stdin.write(chunk)
+            proc.stdin.flush()
+            while not pages.empty():
+                data = pages.get_nowait()
+                if data is None:
+                    return
+                yield data
+        proc.stdin.close()
+
+        while True:
+            data = pages.get()
+            if data is None:
+                break
+            yield data
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
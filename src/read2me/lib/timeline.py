@@ -0,0 +1,49 @@
+"""
+Audiobook timeline
+Cumulative chapter start times from metadata.json for O(log n) seeking across chapters
+"""
+
+import bisect
+from typing import Dict, List, Optional
+
+
+class Timeline:
+    """Maps a position in the whole book to a chapter, an offset in it and a byte offset"""
+
+    def __init__(self, audio_files: List[Dict]):
+        self.audio_files = audio_files
+        self.starts = []
+        position = 0.0
+        for audio_file in audio_files:
+            if audio_file.get("duration") is None:
+                raise ValueError(f"Chapter {audio_file.get('chapter')} has no recorded duration")
+            self.starts.append(audio_file.get("start_time", position))
+            position = self.starts[-1] + audio_file["duration"]
+        self.total_duration = position
+
+    @classmethod
+    def from_metadata(cls, metadata: Dict) -> "Timeline":
+        return cls(metadata["audio_files"])
+
+    def locate(self, seconds: float) -> Dict:
+        """Chapter number, offset within it and (for WAV) the byte offset of that sample"""
+        if not self.starts:
+            raise ValueError("Timeline is empty")
+        seconds = min(max(0.0, seconds), self.total_duration)
+        index = max(0, bisect.bisect_right(self.starts, seconds) - 1)
+        audio_file = self.audio_files[index]
+        offset = min(seconds - self.starts[index], audio_file["duration"])
+        return {
+            "chapter": audio_file["chapter"],
+            "offset": offset,
+            "byte_offset": self._byte_offset(audio_file, offset),
+        }
+
+    @staticmethod
+    def _byte_offset(audio_file: Dict, offset: float) -> Optional[int]:
+        data_offset = audio_file.get("data_offset")
+        sample_rate = audio_file.get("sample_rate")
+        if data_offset is None or not sample_rate:
+            return None
+        sample = min(int(offset * sample_rate), audio_file.get("samples") or 0)
+        return data_offset + sample * 2  # 16-bit mono
@@ -0,0 +1,75 @@
+"""
+Parity of data_gathering/silence.py with pydub's silence detection and splitting
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pydub = pytest.importorskip("pydub")
+from pydub.silence import detect_silence as pydub_detect_silence, split_on_silence
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "data_gathering"))
+from silence import detect_silence, split_ranges  # noqa: E402
+
+MIN_SILENCE_LEN = 500
+SILENCE_THRESH = -40
+KEEP_SILENCE = 300
+
+
+def synthetic_audio(frame_rate, channels, seed):
+    """Speech-like bursts between quiet gaps, with short blips inside some of the gaps"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for _ in range(12):
+        loud_ms = int(rng.integers(200, 3000))
+        parts.append(rng.normal(0, 4000, (loud_ms * frame_rate // 1000, channels)))
+        quiet_ms = int(rng.integers(100, 2500))
+        quiet = rng.normal(0, 60, (quiet_ms * frame_rate // 1000, channels))
+        if quiet_ms > 1200 and rng.random() < 0.7:
+            # A blip in the middle breaks the windows around it, but not the silent range
+            blip = int(rng.integers(20, 80)) * frame_rate // 1000
+            middle = len(quiet) // 2
+            quiet[middle:middle + blip] = rng.normal(0, 2000, (blip, channels))
+        parts.append(quiet)
+    samples = np.clip(np.rint(np.concatenate(parts)), -32768, 32767).astype("<i2")
+    segment = pydub.AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=frame_rate,
+                                 channels=channels)
+    return samples, segment
+
+
+def test_blip_inside_silence_is_one_range():
+    frame_rate = 16000
+    samples = np.zeros((4 * frame_rate, 1), dtype="<i2")
+    samples[:frame_rate] = 8000
+    samples[2 * frame_rate:2 * frame_rate + frame_rate // 20] = 400  # quiet 50 ms blip
+    samples[3 * frame_rate + frame_rate // 20:] = 8000
+    segment = pydub.AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=frame_rate,
+                                 channels=1)
+
+    expected = pydub_detect_silence(segment, MIN_SILENCE_LEN, SILENCE_THRESH)
+    assert len(expected) == 1
+    assert detect_silence(samples, frame_rate, MIN_SILENCE_LEN, SILENCE_THRESH) == expected
+
+
+@pytest.mark.parametrize("frame_rate,channels", [(16000, 1), (22050, 1), (44100, 2)])
+@pytest.mark.parametrize("block_ms", [60_000, 700, 1237])
+def test_detect_silence_matches_pydub(frame_rate, channels, block_ms):
+    samples, segment = synthetic_audio(frame_rate, channels, seed=frame_rate + channels)
+    expected = pydub_detect_silence(segment, MIN_SILENCE_LEN, SILENCE_THRESH)
+    assert detect_silence(samples, frame_rate, MIN_SILENCE_LEN, SILENCE_THRESH, block_ms) == expected
+
+
+@pytest.mark.parametrize("frame_rate,channels", [(16000, 1), (22050, 2)])
+def test_split_ranges_matches_split_on_silence(frame_rate, channels):
+    samples, segment = synthetic_audio(frame_rate, channels, seed=7)
+    expected = split_on_silence(segment, MIN_SILENCE_LEN, SILENCE_THRESH, KEEP_SILENCE)
+
+    silent_ranges = detect_silence(samples, frame_rate, MIN_SILENCE_LEN, SILENCE_THRESH)
+    chunks = split_ranges(len(segment), silent_ranges, KEEP_SILENCE)
+    assert len(chunks) == len(expected)
+    for (start_ms, end_ms), chunk in zip(chunks, expected):
+        frames = samples[start_ms * frame_rate // 1000:end_ms * frame_rate // 1000]
+        assert frames.tobytes() == chunk.raw_data
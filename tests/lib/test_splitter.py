@@ -0,0 +1,57 @@
+"""
+Streaming paragraph splitting in read2me/lib/splitter.py
+"""
+
+import importlib.util
+import os
+import random
+
+import pytest
+
+# Load the module on its own; the read2me package pulls in the TTS stack
+_spec = importlib.util.spec_from_file_location(
+    "splitter", os.path.join(os.path.dirname(__file__), "..", "..", "src", "read2me", "lib", "splitter.py")
+)
+splitter = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(splitter)
+
+WORDS = ["foo", "bar", "baz", "qux", "hello", "world"]
+PUNCTUATION = ["", ".", ",", "!", "?", ";"]
+SEPARATORS = [" ", "  ", "\n", "\n\n", " \n\n ", "    "]
+
+
+def random_text(rng):
+    prefix = rng.choice(["", "\n\n ", " "])
+    return prefix + "".join(
+        rng.choice(WORDS) + rng.choice(PUNCTUATION) + rng.choice(SEPARATORS)
+        for _ in range(rng.randint(0, 40))
+    )
+
+
+def random_blocks(rng, text):
+    cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 6))))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def chunks(paragraphs, max_length):
+    return [(c.start, c.end, str(c)) for c in splitter.iter_chunks(paragraphs, max_length)]
+
+
+def test_padded_paragraph_that_fits_is_not_cut():
+    text = "\n\n baz; \n\n    bar! world. qux?    world. hello world. foo,   "
+    assert list(splitter.iter_paragraphs([text], 48)) == [
+        (3, "baz;"),
+        (14, "bar! world. qux?    world. hello world. foo,"),
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_streamed_cuts_match_buffered_split(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        text = random_text(rng)
+        max_length = rng.randint(4, 60)
+        expected = chunks(splitter.iter_paragraphs([text]), max_length)
+        assert chunks(splitter.iter_paragraphs([text], max_length), max_length) == expected
+        streamed = splitter.iter_paragraphs(random_blocks(rng, text), max_length)
+        assert chunks(streamed, max_length) == expected